@@ -0,0 +1,62 @@
+from threading import Lock
+from time import monotonic
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from octodns.provider import ProviderException
+
+
+class DeadlineExceeded(ProviderException):
+    pass
+
+
+def build_session(headers, pool_connections=10, pool_maxsize=10):
+    sess = Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize
+    )
+    sess.mount('https://', adapter)
+    sess.mount('http://', adapter)
+    sess.headers.update(headers)
+    return sess
+
+
+class Deadline:
+    # Overall time budget of a run, counted from the first request made
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self._expires_at = None
+        self._lock = Lock()
+
+    def remaining(self):
+        # Seconds left, None without a deadline. The first of concurrent
+        # requests starts the clock.
+        if self.seconds is None:
+            return None
+        now = monotonic()
+        with self._lock:
+            if self._expires_at is None:
+                self._expires_at = now + self.seconds
+        return self._expires_at - now
+
+    def timeout(self, connect_timeout, read_timeout):
+        # Timeouts for the next request, capped by the time that is left
+        remaining = self.remaining()
+        if remaining is None:
+            return (connect_timeout, read_timeout)
+        if remaining <= 0:
+            raise DeadlineExceeded(f'Deadline of {self.seconds}s exceeded')
+        return (min(connect_timeout, remaining), min(read_timeout, remaining))
+
+    def check_wait(self, delay):
+        # Returns delay, unless waiting that long would run past the
+        # deadline, nothing could be sent after it anyway
+        remaining = self.remaining()
+        if remaining is not None and delay >= remaining:
+            raise DeadlineExceeded(
+                f'Deadline of {self.seconds}s exceeded, '
+                f'{remaining:.2f}s left to wait {delay:.2f}s'
+            )
+        return delay
@@ -1,7 +1,7 @@
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from logging import getLogger
 
-from requests import Session
 from requests.exceptions import HTTPError
 
 from octodns import __version__ as octodns_version
@@ -13,6 +13,7 @@ from octodns_selectel.escaping_semicolon import (
     escape_semicolon,
     unescape_semicolon,
 )
+from octodns_selectel.session import Deadline, build_session
 from octodns_selectel.version import __version__ as provider_version
 
 
@@ -42,52 +43,148 @@ class SelectelProvider(BaseProvider):
 
     API_URL = 'https://api.selectel.ru/domains/v1'
 
-    def __init__(self, id, token, *args, **kwargs):
+    # Fields holding domain names, the API may return them without the dot
+    _DOMAIN_FIELDS = {
+        'ALIAS': 'content',
+        'CNAME': 'content',
+        'MX': 'content',
+        'NS': 'content',
+        'SRV': 'target',
+    }
+    # Types with a single value, the old one has to go before the new one
+    _SINGLE_VALUE_TYPES = {'ALIAS', 'CNAME'}
+
+    def __init__(
+        self,
+        id,
+        token,
+        pool_connections=10,
+        pool_maxsize=None,
+        connect_timeout=10.0,
+        read_timeout=60.0,
+        deadline=None,
+        pagination_limit=PAGINATION_LIMIT,
+        pagination_workers=1,
+        delete_workers=1,
+        *args,
+        **kwargs,
+    ):
         self.log = getLogger(f'SelectelProvider[{id}]')
-        self.log.debug('__init__: id=%s', id)
+        self.log.debug(
+            '__init__: id=%s, pool_connections=%d, pool_maxsize=%s, '
+            'connect_timeout=%s, read_timeout=%s, deadline=%s, '
+            'pagination_limit=%d, pagination_workers=%d, delete_workers=%d',
+            id,
+            pool_connections,
+            pool_maxsize,
+            connect_timeout,
+            read_timeout,
+            deadline,
+            pagination_limit,
+            pagination_workers,
+            delete_workers,
+        )
         super().__init__(id, *args, **kwargs)
 
-        self._sess = Session()
-        self._sess.headers.update(
+        self._sess = build_session(
             {
                 'X-Token': token,
                 'Content-Type': 'application/json',
                 'User-Agent': f'octodns/{octodns_version} octodns-selectel/{provider_version}',
-            }
+            },
+            pool_connections=pool_connections,
+            # Unless given, as many as there may be pages or deletes in
+            # flight, so no worker waits for a connection of its own
+            pool_maxsize=pool_maxsize
+            or max(10, pagination_workers, delete_workers),
         )
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._deadline = Deadline(deadline)
+        self.pagination_limit = pagination_limit
+        self.pagination_workers = pagination_workers
+        self.delete_workers = delete_workers
         self._zone_records = {}
+        # (name, type) -> records of a zone, built from _zone_records
+        self._zone_index = {}
         self._domain_list = self.domain_list()
         self._zones = None
 
-    def _request(self, method, path, params=None, data=None):
+    def _timeout(self):
+        return self._deadline.timeout(self._connect_timeout, self._read_timeout)
+
+    def _send(self, method, path, params=None, data=None):
+        # Response of the request, None if nothing was found
         self.log.debug('_request: method=%s, path=%s', method, path)
 
         url = f'{self.API_URL}{path}'
-        resp = self._sess.request(method, url, params=params, json=data)
+        resp = self._sess.request(
+            method, url, params=params, json=data, timeout=self._timeout()
+        )
 
         self.log.debug('_request: status=%s', resp.status_code)
         if resp.status_code == 401:
             raise SelectelAuthenticationRequired(resp.text)
         elif resp.status_code == 404:
-            return {}
+            return None
         resp.raise_for_status()
-        if method == 'DELETE':
+        return resp
+
+    def _request(self, method, path, params=None, data=None):
+        resp = self._send(method, path, params, data)
+        if resp is None or method == 'DELETE':
             return {}
         return resp.json()
 
-    def _get_total_count(self, path):
-        url = f'{self.API_URL}{path}'
-        resp = self._sess.request('HEAD', url)
-        return int(resp.headers['X-Total-Count'])
-
-    def _request_with_pagination(self, path, total_count):
-        result = []
-        for offset in range(0, total_count, self.PAGINATION_LIMIT):
-            result += self._request(
-                'GET',
-                path,
-                params={'limit': self.PAGINATION_LIMIT, 'offset': offset},
-            )
+    def _page_params(self, offset):
+        return {'limit': self.pagination_limit, 'offset': offset}
+
+    def _request_page(self, path, offset):
+        return self._request('GET', path, params=self._page_params(offset))
+
+    @staticmethod
+    def _unique_by_id(entities):
+        # Pages requested at once are read at different times, an entity
+        # added or removed meanwhile shifts the rest to the next page and
+        # some entity may then come on two of them
+        seen = set()
+        unique = []
+        for entity in entities:
+            if entity['id'] not in seen:
+                seen.add(entity['id'])
+                unique.append(entity)
+        return unique
+
+    def _request_with_pagination(self, path):
+        # The first page comes with the total count in a header, so the
+        # remaining offsets are known without a separate HEAD request
+        resp = self._send('GET', path, params=self._page_params(0))
+        if resp is None:
+            return []
+        result = resp.json()
+        total_count = resp.headers.get('X-Total-Count')
+        if total_count is None:
+            # Pages are requested one by one until a short one
+            page = result
+            offset = 0
+            while len(page) >= self.pagination_limit:
+                offset += self.pagination_limit
+                page = self._request_page(path, offset)
+                result += page
+            return result
+        offsets = range(
+            self.pagination_limit, int(total_count), self.pagination_limit
+        )
+        if self.pagination_workers > 1:
+            with ThreadPoolExecutor(self.pagination_workers) as executor:
+                pages = executor.map(
+                    lambda offset: self._request_page(path, offset), offsets
+                )
+                for page in pages:
+                    result += page
+            return self._unique_by_id(result)
+        for offset in offsets:
+            result += self._request_page(path, offset)
         return result
 
     def _include_change(self, change):
@@ -120,9 +217,78 @@ class SelectelProvider(BaseProvider):
         for params in params_for(new):
             self.create_record(zone_name, params)
 
+    def _value_key(self, _type, fields, record):
+        # What tells values of a record apart: all it is created with but its
+        # name and ttl. Records read from the API come with more than that.
+        domain_field = self._DOMAIN_FIELDS.get(_type)
+        return tuple(
+            (
+                require_root_domain(str(record.get(field)))
+                if field == domain_field
+                else str(record.get(field))
+            )
+            for field in fields
+        )
+
     def _apply_update(self, zone_name, change):
-        self._apply_delete(zone_name, change)
-        self._apply_create(zone_name, change)
+        # The API keeps a record per value, so only the values that differ
+        # are touched: added ones are created, removed ones deleted and kept
+        # ones updated in place if their ttl has changed.
+        new = change.new
+        params_for = getattr(self, f'_params_for_{new._type}')
+        new_params = list(params_for(new))
+        fields = sorted(set(new_params[0]) - {'name', 'ttl'})
+        existing = {}
+        index = self._indexed_zone_records(zone_name)
+        index_key = (new.fqdn[:-1], new._type)
+        records = index.get(index_key, [])
+        for record in records:
+            key = self._value_key(new._type, fields, record)
+            existing[key] = record
+        creates, updates = [], []
+        for params in new_params:
+            key = self._value_key(new._type, fields, params)
+            record = existing.pop(key, None)
+            if record is None:
+                creates.append(params)
+            elif record['ttl'] != params['ttl']:
+                updates.append((record['id'], params))
+        removed = [record['id'] for record in existing.values()]
+        self.log.debug(
+            '_apply_update: %s %s, creates=%d, updates=%d, deletes=%d',
+            new.fqdn,
+            new._type,
+            len(creates),
+            len(updates),
+            len(removed),
+        )
+        failed = []
+        if new._type in self._SINGLE_VALUE_TYPES:
+            # There can't be two of them, so no overlap here
+            failed = self.delete_records(zone_name, removed)
+        created = [self.create_record(zone_name, params) for params in creates]
+        for record_id, params in updates:
+            self.update_record(zone_name, record_id, params)
+        if new._type not in self._SINGLE_VALUE_TYPES:
+            # Removed values go last, so the name keeps resolving meanwhile
+            failed = self.delete_records(zone_name, removed)
+        # The index is what later deletes of the name go by, it follows the
+        # records just written
+        if not all(
+            isinstance(record, dict) and record.get('id') for record in created
+        ):
+            # Responses not telling the ids, the zone is listed again when
+            # needed
+            self._zone_index.pop(f'{zone_name}.', None)
+            self._zone_records.pop(f'{zone_name}.', None)
+            return
+        deleted = set(removed) - set(failed)
+        ttls = {record_id: params['ttl'] for record_id, params in updates}
+        index[index_key] = [
+            dict(record, ttl=ttls.get(record['id'], record['ttl']))
+            for record in records
+            if record['id'] not in deleted
+        ] + created
 
     def _apply_delete(self, zone_name, change):
         existing = change.existing
@@ -304,10 +470,7 @@ class SelectelProvider(BaseProvider):
     def domain_list(self):
         path = '/'
         domains = {}
-        domains_list = []
-
-        total_count = self._get_total_count(path)
-        domains_list = self._request_with_pagination(path, total_count)
+        domains_list = self._request_with_pagination(path)
 
         for domain in domains_list:
             domains[domain['name']] = domain
@@ -315,12 +478,10 @@ class SelectelProvider(BaseProvider):
 
     def zone_records(self, zone):
         path = f'/{zone.name[:-1]}/records/'
-        zone_records = []
-
-        total_count = self._get_total_count(path)
-        zone_records = self._request_with_pagination(path, total_count)
+        zone_records = self._request_with_pagination(path)
 
         self._zone_records[zone.name] = zone_records
+        self._zone_index.pop(zone.name, None)
         return self._zone_records[zone.name]
 
     def create_domain(self, name, zone=""):
@@ -342,27 +503,79 @@ class SelectelProvider(BaseProvider):
         path = f'/{domain_id}/records/'
         return self._request('POST', path, data=data)
 
+    def _indexed_zone_records(self, zone_name):
+        # Records of the zone by (name, type), loaded if it wasn't populated
+        key = f'{zone_name}.'
+        index = self._zone_index.get(key)
+        if index is None:
+            records = self._zone_records.get(key)
+            if records is None:
+                domain_id = self._domain_list[zone_name]['id']
+                path = f'/{domain_id}/records/'
+                records = self._request_with_pagination(path)
+                self._zone_records[key] = records
+            index = defaultdict(list)
+            for record in records:
+                index[(record['name'], record['type'])].append(record)
+            self._zone_index[key] = index
+        return index
+
+    def update_record(self, zone_name, record_id, data):
+        self.log.debug('Update record. Zone: %s, data %s', zone_name, data)
+        domain_id = self._domain_list[zone_name]['id']
+        path = f'/{domain_id}/records/{record_id}'
+        return self._request('PUT', path, data=data)
+
+    def _delete_record_id(self, domain_id, record_id):
+        try:
+            self._request('DELETE', f'/{domain_id}/records/{record_id}')
+        except HTTPError:
+            return False
+        return True
+
+    def delete_records(self, zone_name, record_ids):
+        # Ids of the records that couldn't be deleted
+        domain_id = self._domain_list[zone_name]['id']
+        if self.delete_workers > 1 and len(record_ids) > 1:
+            with ThreadPoolExecutor(self.delete_workers) as executor:
+                deleted = list(
+                    executor.map(
+                        lambda record_id: self._delete_record_id(
+                            domain_id, record_id
+                        ),
+                        record_ids,
+                    )
+                )
+        else:
+            deleted = [
+                self._delete_record_id(domain_id, record_id)
+                for record_id in record_ids
+            ]
+        failed = [
+            record_id for record_id, ok in zip(record_ids, deleted) if not ok
+        ]
+        if failed:
+            self.log.warning(
+                'Failed to delete %d record(s): %s',
+                len(failed),
+                ', '.join(str(record_id) for record_id in failed),
+            )
+        self.log.debug(
+            f'Deleted {len(record_ids) - len(failed)} records. '
+            f'Skipped {len(failed)} records'
+        )
+        return failed
+
     def delete_record(self, domain, _type, zone):
         self.log.debug('Delete records. Domain: %s, Type: %s', domain, _type)
-        domain_id = self._domain_list[domain]['id']
-        records = self._zone_records.get(f'{domain}.', False)
-        if not records:
-            path = f'/{domain_id}/records/'
-            records = self._request('GET', path)
-
+        index = self._indexed_zone_records(domain)
         full_domain = f'{zone}.{domain}' if zone else domain
-        delete_count, skip_count = 0, 0
-        for record in records:
-            if record['type'] == _type and record['name'] == full_domain:
-                record_id = record["id"]
-                path = f'/{domain_id}/records/{record_id}'
-                try:
-                    self._request('DELETE', path)
-                    delete_count += 1
-                except HTTPError:
-                    skip_count += 1
-                    self.log.warning(f'Failed to delete record {record_id}')
-
-        self.log.debug(
-            f'Deleted {delete_count} records. Skipped {skip_count} records'
+        records = index.pop((full_domain, _type), [])
+        failed = set(
+            self.delete_records(domain, [record['id'] for record in records])
         )
+        if failed:
+            # Still there
+            index[(full_domain, _type)] = [
+                record for record in records if record['id'] in failed
+            ]
@@ -0,0 +1,203 @@
+from asyncio import Semaphore, gather, run, sleep
+from time import perf_counter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from .dns_client import BaseDNSClient
+from .exceptions import SelectelException
+from .tracing import request_span
+
+
+# asyncio counterpart of DNSClient built on httpx, used as an async context
+# manager. At most max_concurrency requests are in flight at any moment, the
+# rest wait for their turn without holding a thread each.
+class AsyncDNSClient(BaseDNSClient):
+    def __init__(
+        self,
+        library_version: str,
+        openstack_token: str,
+        max_concurrency: int = 32,
+        transport=None,
+        **kwargs,
+    ):
+        if httpx is None:
+            raise SelectelException(
+                'AsyncDNSClient requires httpx, install octodns-selectel[async]'
+            )
+        super().__init__(library_version, openstack_token, **kwargs)
+        self._max_concurrency = max_concurrency
+        self._transport = transport
+        self._client = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        # Created here rather than in __init__ so they are bound to the loop
+        # the client is actually used in
+        self._semaphore = Semaphore(self._max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=self.API_URL,
+            headers=self._headers,
+            transport=self._transport,
+            limits=httpx.Limits(max_connections=self._max_concurrency),
+            timeout=httpx.Timeout(
+                self._read_timeout, connect=self._connect_timeout
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *args):
+        await self._client.aclose()
+        self._client = None
+
+    async def _request(self, method, path, params=None, data=None):
+        if self._tracer is None:
+            return await self._send(method, path, params, data)
+        with request_span(self._tracer, method, path, params) as span:
+            return await self._send(method, path, params, data, span)
+
+    async def _send(self, method, path, params, data, span=None):
+        observers = self._observers
+        attempt = 0
+        while True:
+            delay = self._rate_limit_delay()
+            if delay:
+                await sleep(delay)
+            connect_timeout, read_timeout = self._deadline.timeout(
+                self._connect_timeout, self._read_timeout
+            )
+            try:
+                async with self._semaphore:
+                    if observers:
+                        started = perf_counter()
+                    resp = await self._client.request(
+                        method,
+                        path,
+                        params=params,
+                        json=data,
+                        timeout=httpx.Timeout(
+                            read_timeout, connect=connect_timeout
+                        ),
+                    )
+            except httpx.TransportError as e:
+                if observers:
+                    self._observe(method, path, attempt, started)
+                if (
+                    attempt >= self._retries
+                    or method not in self._IDEMPOTENT_METHODS
+                ):
+                    raise
+                await sleep(self._schedule_retry(method, path, attempt, e))
+                attempt += 1
+                continue
+            if observers:
+                self._observe(
+                    method,
+                    path,
+                    attempt,
+                    started,
+                    resp.status_code,
+                    len(resp.request.content),
+                    len(resp.content),
+                )
+            if attempt < self._retries and self._is_retryable(
+                method, resp.status_code
+            ):
+                delay = self._schedule_retry(
+                    method,
+                    path,
+                    attempt,
+                    resp.status_code,
+                    resp.headers.get('Retry-After'),
+                )
+                if delay is not None:
+                    await sleep(delay)
+                    attempt += 1
+                    continue
+            break
+        self._end_span(span, resp.status_code, attempt)
+        try:
+            resp_json = resp.json()
+        except ValueError:
+            resp_json = {}
+        return self._handle_response(resp.status_code, resp_json)
+
+    async def _request_all_entities(self, path):
+        resp = await self._request("GET", path, self._page_params(0))
+        items = resp["result"]
+        next_offset = resp["next_offset"]
+        if next_offset:
+            # All the remaining pages are requested at once, the semaphore
+            # keeps the number of them actually in flight bounded
+            offsets = range(next_offset, resp["count"], next_offset)
+            pages = await gather(
+                *(
+                    self._request("GET", path, self._page_params(offset))
+                    for offset in offsets
+                )
+            )
+            for resp in pages:
+                items.extend(resp["result"])
+                next_offset = resp["next_offset"]
+        while next_offset:
+            resp = await self._request(
+                "GET", path, self._page_params(next_offset)
+            )
+            items.extend(resp["result"])
+            next_offset = resp["next_offset"]
+        return list(self._unique_by_id(items))
+
+    async def list_zones(self):
+        return await self._request_all_entities(self._zone_path)
+
+    async def create_zone(self, name):
+        return await self._request(
+            'POST', self._zone_path, data=dict(name=name)
+        )
+
+    async def list_rrsets(self, zone_id):
+        path = self._rrset_path(zone_id)
+        return await self._request_all_entities(path)
+
+    async def create_rrset(self, zone_id, data):
+        path = self._rrset_path(zone_id)
+        return await self._request('POST', path, data=data)
+
+    async def update_rrset(self, zone_id, rrset_id, data):
+        path = self._rrset_path_specific(zone_id, rrset_id)
+        return await self._request('PATCH', path, data=data)
+
+    async def delete_rrset(self, zone_id, rrset_id):
+        path = self._rrset_path_specific(zone_id, rrset_id)
+        return await self._request('DELETE', path)
+
+
+# Blocking facade over AsyncDNSClient for synchronous callers such as
+# SelectelProvider. Each run fans a batch of client calls out on a fresh event
+# loop and waits for all of them.
+class AsyncDNSClientRunner:
+    def __init__(self, library_version: str, openstack_token: str, **kwargs):
+        self.client = AsyncDNSClient(library_version, openstack_token, **kwargs)
+
+    @staticmethod
+    def _call(client, call):
+        if callable(call):
+            return call(client)
+        name, *args = call
+        return getattr(client, name)(*args)
+
+    def run(self, calls):
+        # calls are (method name, *args) tuples, e.g.
+        # ('create_rrset', zone_id, data), or coroutine functions called with
+        # the client. Results come back in the same order, failed calls have
+        # their exception in place of a result.
+        async def _run():
+            async with self.client as client:
+                return await gather(
+                    *(self._call(client, call) for call in calls),
+                    return_exceptions=True,
+                )
+
+        return run(_run())
@@ -1,11 +1,27 @@
-from requests import Session
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from itertools import chain
+from logging import getLogger
+from random import uniform
+from threading import Lock
+from time import perf_counter, sleep
+
+from requests.exceptions import ConnectionError, Timeout
 
 from octodns import __version__ as octodns_version
 
-from .exceptions import ApiException
+from octodns_selectel.session import Deadline, build_session
+
+from .exceptions import ApiException, ApiNotFoundException
+from .instrumentation import RequestEvent, path_template
+from .rate_limiter import get_rate_limiter
+from .tracing import request_span
 
 
-class DNSClient:
+class BaseDNSClient:
     API_URL = 'https://api.selectel.ru/domains/v2'
     _PAGINATION_LIMIT = 1000
 
@@ -13,15 +29,87 @@ class DNSClient:
     __rrsets_path = "/zones/{}/rrset"
     __rrsets_path_specific = "/zones/{}/rrset/{}"
 
-    def __init__(self, library_version: str, openstack_token: str):
-        self._sess = Session()
-        self._sess.headers.update(
-            {
-                'X-Auth-Token': openstack_token,
-                'Content-Type': 'application/json',
-                'User-Agent': f'octodns/{octodns_version} octodns-selectel/{library_version}',
-            }
+    # Statuses worth another try: throttling and unavailable upstreams
+    _RETRY_STATUSES = {429, 502, 503, 504}
+    _IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+    def __init__(
+        self,
+        library_version: str,
+        openstack_token: str,
+        retries: int = 3,
+        retry_backoff: float = 0.5,
+        retry_backoff_max: float = 30.0,
+        retry_after_max: float = 300.0,
+        rate_limit: float = None,
+        rate_limit_burst: int = None,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+        deadline=None,
+        observers=None,
+        tracer=None,
+    ):
+        self.log = getLogger('SelectelDNSClient')
+        self._headers = {
+            'X-Auth-Token': openstack_token,
+            'Content-Type': 'application/json',
+            'User-Agent': f'octodns/{octodns_version} octodns-selectel/{library_version}',
+        }
+        self._rate_limiter = None
+        if rate_limit:
+            self._rate_limiter = get_rate_limiter(
+                openstack_token, rate_limit, rate_limit_burst or rate_limit
+            )
+        self._retries = retries
+        self._retry_backoff = retry_backoff
+        self._retry_backoff_max = retry_backoff_max
+        self._retry_after_max = retry_after_max
+        self._retry_count_lock = Lock()
+        self.retry_count = 0
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        # Seconds or a Deadline shared with other clients of the same run
+        if not isinstance(deadline, Deadline):
+            deadline = Deadline(deadline)
+        self._deadline = deadline
+        self._observers = list(observers or ())
+        # OpenTelemetry tracer, a span per request if there's one
+        self._tracer = tracer
+
+    def add_observer(self, observer):
+        # observer is called with a RequestEvent for every request sent
+        self._observers.append(observer)
+
+    def remove_observer(self, observer):
+        self._observers.remove(observer)
+
+    def _observe(
+        self,
+        method,
+        path,
+        attempt,
+        started,
+        status=None,
+        request_bytes=0,
+        response_bytes=0,
+    ):
+        event = RequestEvent(
+            method,
+            path_template(path),
+            status,
+            perf_counter() - started,
+            request_bytes,
+            response_bytes,
+            attempt,
         )
+        for observer in self._observers:
+            observer(event)
+
+    @staticmethod
+    def _end_span(span, status_code, attempt):
+        if span is not None:
+            span.set_attribute('http.response.status_code', status_code)
+            span.set_attribute('selectel.retries', attempt)
 
     @classmethod
     def _rrset_path(cls, zone_id):
@@ -31,52 +119,287 @@ class DNSClient:
     def _rrset_path_specific(cls, zone_id, rrset_id):
         return cls.__rrsets_path_specific.format(zone_id, rrset_id)
 
-    def _request(self, method, path, params=None, data=None):
-        url = f'{self.API_URL}{path}'
-        resp = self._sess.request(method, url, params, json=data)
+    @classmethod
+    def _page_params(cls, offset, filters=None):
+        return dict(
+            filters or {},
+            limit=cls._PAGINATION_LIMIT,
+            offset=offset,
+            sort_by="name.descend",
+        )
+
+    def _is_retryable(self, method, status_code):
+        if status_code == 429:
+            # Throttled requests were not processed, so even writes are safe
+            # to send again
+            return True
+        return (
+            status_code in self._RETRY_STATUSES
+            and method in self._IDEMPOTENT_METHODS
+        )
+
+    @staticmethod
+    def _parse_retry_after(value):
+        # Retry-After holds either a number of seconds or an HTTP date
         try:
-            resp_json = resp.json()
+            return float(value)
         except ValueError:
-            resp_json = {}
-        if resp.status_code in {200, 201, 204}:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return (retry_at - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+
+    def _retry_delay(self, attempt, retry_after=None):
+        # None if the server asks to wait longer than retry_after_max, a
+        # retry sent any earlier would only be rejected again
+        if retry_after is not None:
+            delay = self._parse_retry_after(retry_after)
+            if delay is not None:
+                if delay > self._retry_after_max:
+                    return None
+                return max(delay, 0)
+        # Capped exponential backoff with full jitter
+        return uniform(
+            0, min(self._retry_backoff_max, self._retry_backoff * 2**attempt)
+        )
+
+    def _schedule_retry(self, method, path, attempt, reason, retry_after=None):
+        delay = self._retry_delay(attempt, retry_after)
+        if delay is None:
+            self.log.warning(
+                '_request: not retrying %s %s, Retry-After %s is over %ss',
+                method,
+                path,
+                retry_after,
+                self._retry_after_max,
+            )
+            return None
+        # Waits count against the deadline like the requests themselves
+        self._deadline.check_wait(delay)
+        with self._retry_count_lock:
+            self.retry_count += 1
+        self.log.warning(
+            '_request: retrying %s %s in %.2fs, attempt=%d/%d, reason=%s',
+            method,
+            path,
+            delay,
+            attempt + 1,
+            self._retries,
+            reason,
+        )
+        return delay
+
+    def _rate_limit_delay(self):
+        # How long to wait for the turn of the next request
+        if not self._rate_limiter:
+            return 0
+        return self._deadline.check_wait(self._rate_limiter.reserve())
+
+    @staticmethod
+    def _unique_by_id(entities):
+        # Entities created or deleted while pages are in flight shift the
+        # offsets, so the same entity may show up on two adjacent pages.
+        seen = set()
+        for entity in entities:
+            if entity["id"] not in seen:
+                seen.add(entity["id"])
+                yield entity
+
+    @staticmethod
+    def _handle_response(status_code, resp_json):
+        if status_code in {200, 201, 204}:
             return resp_json
-        elif resp.status_code in {400, 422}:
+        elif status_code in {400, 422}:
             raise ApiException(
                 f'Bad request. Description: {resp_json.get("description", "Invalid payload")}.'
             )
-        elif resp.status_code == 401:
+        elif status_code == 401:
             raise ApiException('Authorization failed. Invalid or empty token.')
-        elif resp.status_code == 404:
-            raise ApiException(
+        elif status_code == 404:
+            raise ApiNotFoundException(
                 'Resource not found: '
                 f'{resp_json.get("error", "invalid path")}.'
             )
-        elif resp.status_code == 409:
+        elif status_code == 409:
             raise ApiException(
                 f'Conflict: {resp_json.get("error", "resource maybe already created")}.'
             )
+        elif status_code == 429:
+            raise ApiException('Too many requests.')
         else:
             raise ApiException('Internal server error.')
 
-    def _request_all_entities(self, path, offset=0):
-        items = []
-        resp = self._request(
-            "GET",
-            path,
-            dict(
-                limit=self._PAGINATION_LIMIT,
-                offset=offset,
-                sort_by="name.descend",
-            ),
+
+class DNSClient(BaseDNSClient):
+    def __init__(
+        self,
+        library_version: str,
+        openstack_token: str,
+        pagination_workers: int = 1,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        **kwargs,
+    ):
+        super().__init__(library_version, openstack_token, **kwargs)
+        self._pagination_workers = pagination_workers
+        # A single session for all threads: its connection pool is safe to
+        # share and nothing about the session changes once it's built, so
+        # workers reuse each other's kept-alive connections
+        self._sess = build_session(
+            self._headers,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
         )
-        items.extend(resp["result"])
-        if next_offset := resp["next_offset"]:
-            items.extend(self._request_all_entities(path, offset=next_offset))
-        return items
+
+    def _retry(self, method, path, attempt, reason, retry_after=None):
+        # False if the request isn't worth retrying after all
+        delay = self._schedule_retry(method, path, attempt, reason, retry_after)
+        if delay is None:
+            return False
+        sleep(delay)
+        return True
+
+    def _request(self, method, path, params=None, data=None):
+        if self._tracer is None:
+            return self._send(method, path, params, data)
+        with request_span(self._tracer, method, path, params) as span:
+            return self._send(method, path, params, data, span)
+
+    def _send(self, method, path, params, data, span=None):
+        url = f'{self.API_URL}{path}'
+        # Nothing is measured unless somebody is listening
+        observers = self._observers
+        attempt = 0
+        while True:
+            delay = self._rate_limit_delay()
+            if delay:
+                sleep(delay)
+            timeout = self._deadline.timeout(
+                self._connect_timeout, self._read_timeout
+            )
+            if observers:
+                started = perf_counter()
+            try:
+                resp = self._sess.request(
+                    method, url, params, json=data, timeout=timeout
+                )
+            except (ConnectionError, Timeout) as e:
+                if observers:
+                    self._observe(method, path, attempt, started)
+                if (
+                    attempt >= self._retries
+                    or method not in self._IDEMPOTENT_METHODS
+                ):
+                    raise
+                self._retry(method, path, attempt, e)
+                attempt += 1
+                continue
+            if observers:
+                self._observe(
+                    method,
+                    path,
+                    attempt,
+                    started,
+                    resp.status_code,
+                    len(resp.request.body or b''),
+                    len(resp.content),
+                )
+            if (
+                attempt < self._retries
+                and self._is_retryable(method, resp.status_code)
+                and self._retry(
+                    method,
+                    path,
+                    attempt,
+                    resp.status_code,
+                    resp.headers.get('Retry-After'),
+                )
+            ):
+                attempt += 1
+                continue
+            break
+        self._end_span(span, resp.status_code, attempt)
+        try:
+            resp_json = resp.json()
+        except ValueError:
+            resp_json = {}
+        return self._handle_response(resp.status_code, resp_json)
+
+    def _request_page(self, path, offset, filters=None):
+        return self._request("GET", path, self._page_params(offset, filters))
+
+    def _iter_pages(self, path, filters=None):
+        resp = self._request_page(path, 0, filters)
+        next_offset = resp["next_offset"]
+        yield resp["result"]
+        if next_offset and self._pagination_workers > 1:
+            # The first page tells how many entities there are and how many
+            # the server returns per page, so every remaining offset is known
+            # upfront and can be requested at once.
+            offsets = range(next_offset, resp["count"], next_offset)
+            for resp in self._iter_pages_concurrently(path, offsets, filters):
+                next_offset = resp["next_offset"]
+                yield resp["result"]
+        while next_offset:
+            resp = self._request_page(path, next_offset, filters)
+            next_offset = resp["next_offset"]
+            yield resp["result"]
+
+    def _iter_pages_concurrently(self, path, offsets, filters):
+        # Only a couple of pages per worker are kept in flight, so a slow
+        # consumer doesn't end up with the whole listing buffered in memory.
+        window = 2 * self._pagination_workers
+        pending = deque()
+        with ThreadPoolExecutor(self._pagination_workers) as executor:
+            for offset in offsets:
+                # Observers see the context of the caller, e.g. the report
+                # of the operation the listing is made for
+                pending.append(
+                    executor.submit(
+                        copy_context().run,
+                        self._request_page,
+                        path,
+                        offset,
+                        filters,
+                    )
+                )
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    @staticmethod
+    def _observed_pages(pages, on_page):
+        for page in pages:
+            on_page(page)
+            yield page
+
+    def _iter_all_entities(self, path, filters=None, on_page=None):
+        pages = self._iter_pages(path, filters)
+        if on_page is not None:
+            # on_page is called with the entities of every page listed
+            pages = self._observed_pages(pages, on_page)
+        entities = chain.from_iterable(pages)
+        if self._pagination_workers > 1:
+            return self._unique_by_id(entities)
+        return entities
+
+    def _request_all_entities(self, path):
+        return list(self._iter_all_entities(path))
 
     def list_zones(self):
         return self._request_all_entities(self._zone_path)
 
+    def get_zone_by_name(self, name):
+        # filter matches zones containing the name, the exact one is picked
+        # out of those
+        for zone in self._iter_all_entities(self._zone_path, dict(filter=name)):
+            if zone["name"] == name:
+                return zone
+        return None
+
     def create_zone(self, name):
         return self._request('POST', self._zone_path, data=dict(name=name))
 
@@ -84,6 +407,29 @@ class DNSClient:
         path = self._rrset_path(zone_id)
         return self._request_all_entities(path)
 
+    def iter_rrsets(self, zone_id, on_page=None):
+        path = self._rrset_path(zone_id)
+        return self._iter_all_entities(path, on_page=on_page)
+
+    def find_rrsets(self, zone_id, name, rrset_type=None):
+        # search matches rrsets with names containing the name, the exact
+        # ones are picked out of those
+        filters = dict(search=name)
+        if rrset_type:
+            filters['rrset_types'] = rrset_type
+        path = self._rrset_path(zone_id)
+        return [
+            rrset
+            for rrset in self._iter_all_entities(path, filters)
+            if rrset["name"] == name
+            and (rrset_type is None or rrset["type"] == rrset_type)
+        ]
+
+    def count_rrsets(self, zone_id):
+        path = self._rrset_path(zone_id)
+        resp = self._request("GET", path, dict(limit=1, offset=0))
+        return resp["count"]
+
     def create_rrset(self, zone_id, data):
         path = self._rrset_path(zone_id)
         return self._request('POST', path, data=data)
@@ -7,3 +7,7 @@ class SelectelException(ProviderException):
 
 class ApiException(SelectelException):
     pass
+
+
+class ApiNotFoundException(ApiException):
+    pass
@@ -0,0 +1,104 @@
+import re
+from collections import Counter, defaultdict, namedtuple
+from math import ceil
+from threading import Lock
+
+# What observers registered with a DNS client get for every request sent,
+# retries included: path is the template, e.g. /zones/{id}/rrset, status is
+# None when no response came back and latency is in seconds.
+RequestEvent = namedtuple(
+    'RequestEvent',
+    (
+        'method',
+        'path',
+        'status',
+        'latency',
+        'request_bytes',
+        'response_bytes',
+        'attempt',
+    ),
+)
+
+_ids = re.compile(r'(?:(?<=/zones/)|(?<=/rrset/))[^/]+')
+
+
+def path_template(path):
+    return _ids.sub('{id}', path)
+
+
+def _percentile(ordered, percent):
+    # Nearest-rank, always one of the observed values
+    return ordered[max(0, ceil(len(ordered) * percent / 100) - 1)]
+
+
+class _Endpoint:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.retries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+# In-memory aggregator of request events per endpoint, register an instance
+# as an observer and read its summary once done.
+class RequestStats:
+    def __init__(self):
+        self._endpoints = defaultdict(_Endpoint)
+        self._lock = Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            endpoint = self._endpoints[(event.method, event.path)]
+            endpoint.latencies.append(event.latency)
+            endpoint.statuses[event.status] += 1
+            if event.attempt:
+                endpoint.retries += 1
+            endpoint.request_bytes += event.request_bytes
+            endpoint.response_bytes += event.response_bytes
+
+    def update(self, other):
+        # Adds what another instance has aggregated to this one
+        with other._lock:
+            endpoints = list(other._endpoints.items())
+        with self._lock:
+            for key, endpoint in endpoints:
+                own = self._endpoints[key]
+                own.latencies.extend(endpoint.latencies)
+                own.statuses.update(endpoint.statuses)
+                own.retries += endpoint.retries
+                own.request_bytes += endpoint.request_bytes
+                own.response_bytes += endpoint.response_bytes
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def summary(self):
+        # Counters and latency percentiles keyed by "METHOD /path/{id}"
+        summary = {}
+        with self._lock:
+            for (method, path), endpoint in sorted(self._endpoints.items()):
+                latencies = sorted(endpoint.latencies)
+                summary[f'{method} {path}'] = dict(
+                    calls=len(latencies),
+                    retries=endpoint.retries,
+                    errors=sum(
+                        count
+                        for status, count in endpoint.statuses.items()
+                        if status is None or status >= 400
+                    ),
+                    statuses={
+                        str(status): count
+                        for status, count in endpoint.statuses.items()
+                    },
+                    request_bytes=endpoint.request_bytes,
+                    response_bytes=endpoint.response_bytes,
+                    latency=dict(
+                        p50=_percentile(latencies, 50),
+                        p95=_percentile(latencies, 95),
+                        p99=_percentile(latencies, 99),
+                        max=latencies[-1],
+                    ),
+                )
+        return summary
@@ -1,5 +1,3 @@
-from string import Template
-
 from octodns_selectel.escaping_semicolon import (
     escape_semicolon,
     unescape_semicolon,
@@ -7,133 +5,171 @@ from octodns_selectel.escaping_semicolon import (
 
 from .exceptions import SelectelException
 
+# Codecs by record type, (key, encode, decode) tuples. encode turns the
+# octoDNS value(s) found under key, "value" or "values", into the records of a
+# Selectel rrset and decode does the opposite. They are all built once here,
+# so converting a record is a lookup and a tight loop over its values.
+_codecs = {}
 
-def to_selectel_rrset(record):
-    rrset = dict(name=record.fqdn, ttl=record.ttl, type=record._type)
-    rrset_records = []
-    content_caa_tmpl = Template("$flag $tag \"$value\"")
-    content_mx_tmpl = Template("$preference $exchange")
-    content_srv_tmpl = Template("$priority $weight $port $target")
-    content_sshfp_tmpl = Template("$algorithm $fingerprint_type $fingerprint")
-    if record._type in {"A", "AAAA", "NS"}:
-        rrset_records = list(
-            map(lambda value: {'content': value}, record.values)
-        )
-    elif record._type in {"CNAME", "ALIAS", "DNAME"}:
-        rrset_records = [{'content': record.value}]
-    elif record._type == "TXT":
-        rrset_records = [
-            dict(content=f'\"{unescape_semicolon(value)}\"')
-            for value in record.values
-        ]
-    elif record._type == "CAA":
-        rrset_records = [
-            dict(
-                content=content_caa_tmpl.substitute(
-                    flag=value.flags, tag=value.tag, value=value.value
-                )
-            )
-            for value in record.values
-        ]
-    elif record._type == "MX":
-        rrset_records = list(
-            map(
-                lambda value: {
-                    'content': content_mx_tmpl.substitute(
-                        preference=value.preference, exchange=value.exchange
-                    )
-                },
-                record.values,
-            )
+
+def register_codec(rrset_type, encode, decode, key='values'):
+    _codecs[rrset_type] = (key, encode, decode)
+
+
+def _get_codec(rrset_type):
+    try:
+        return _codecs[rrset_type]
+    except KeyError:
+        raise SelectelException(
+            f'DNS Record with type: {rrset_type} not supported'
+        ) from None
+
+
+def _formatter(template):
+    # Values are formatted with a bound str.format of the template, nothing
+    # is parsed or built per call
+    format = template.format
+    return lambda values: [{'content': format(value)} for value in values]
+
+
+def _encode_values(values):
+    return [{'content': value} for value in values]
+
+
+def _decode_values(records):
+    return [record['content'] for record in records]
+
+
+def _encode_value(value):
+    return [{'content': value}]
+
+
+def _decode_value(records):
+    return records[0]['content']
+
+
+def _encode_txt(values):
+    return [{'content': f'"{unescape_semicolon(value)}"'} for value in values]
+
+
+def _decode_txt(records):
+    return [
+        escape_semicolon(record['content']).strip('"\'') for record in records
+    ]
+
+
+def _decode_caa(records):
+    values = []
+    for record in records:
+        flags, tag, value = record['content'].split(' ', 2)
+        values.append({'flags': flags, 'tag': tag, 'value': value.strip('"')})
+    return values
+
+
+def _decode_mx(records):
+    values = []
+    for record in records:
+        preference, exchange = record['content'].split(' ')
+        values.append({'preference': preference, 'exchange': exchange})
+    return values
+
+
+def _decode_srv(records):
+    values = []
+    for record in records:
+        priority, weight, port, target = record['content'].split(' ')
+        values.append(
+            {
+                'priority': priority,
+                'weight': weight,
+                'port': port,
+                'target': target,
+            }
         )
-    elif record._type == "SRV":
-        rrset_records = list(
-            map(
-                lambda value: {
-                    'content': content_srv_tmpl.substitute(
-                        priority=value.priority,
-                        weight=value.weight,
-                        port=value.port,
-                        target=value.target,
-                    )
-                },
-                record.values,
-            )
+    return values
+
+
+def _decode_sshfp(records):
+    values = []
+    for record in records:
+        algorithm, fingerprint_type, fingerprint = record['content'].split(' ')
+        values.append(
+            {
+                'algorithm': algorithm,
+                'fingerprint_type': fingerprint_type,
+                'fingerprint': fingerprint,
+            }
         )
-    elif record._type == "SSHFP":
-        rrset_records = list(
-            map(
-                lambda value: {
-                    'content': content_sshfp_tmpl.substitute(
-                        algorithm=value.algorithm,
-                        fingerprint_type=value.fingerprint_type,
-                        fingerprint=value.fingerprint,
-                    )
-                },
-                record.values,
+    return values
+
+
+for _type in ('A', 'AAAA', 'NS'):
+    register_codec(_type, _encode_values, _decode_values)
+for _type in ('CNAME', 'ALIAS', 'DNAME'):
+    register_codec(_type, _encode_value, _decode_value, key='value')
+register_codec('TXT', _encode_txt, _decode_txt)
+register_codec('CAA', _formatter('{0.flags} {0.tag} "{0.value}"'), _decode_caa)
+register_codec('MX', _formatter('{0.preference} {0.exchange}'), _decode_mx)
+register_codec(
+    'SRV',
+    _formatter('{0.priority} {0.weight} {0.port} {0.target}'),
+    _decode_srv,
+)
+register_codec(
+    'SSHFP',
+    _formatter('{0.algorithm} {0.fingerprint_type} {0.fingerprint}'),
+    _decode_sshfp,
+)
+
+
+# Conversions work on batches, whole pages of a zone or all the changes of a
+# plan, so the loop lives here instead of around a call per item
+
+
+def to_selectel_rrsets(records):
+    codecs = _codecs
+    rrsets = []
+    append = rrsets.append
+    for record in records:
+        rrset_type = record._type
+        try:
+            key, encode, _ = codecs[rrset_type]
+        except KeyError:
+            key, encode, _ = _get_codec(rrset_type)
+        append(
+            dict(
+                name=record.fqdn,
+                ttl=record.ttl,
+                type=rrset_type,
+                records=encode(getattr(record, key)),
             )
         )
-    else:
-        raise SelectelException(
-            f'DNS Record with type: {record._type} not supported'
+    return rrsets
+
+
+def to_octodns_records_data(rrsets):
+    codecs = _codecs
+    records_data = []
+    append = records_data.append
+    for rrset in rrsets:
+        rrset_type = rrset["type"]
+        try:
+            key, _, decode = codecs[rrset_type]
+        except KeyError:
+            key, _, decode = _get_codec(rrset_type)
+        append(
+            {
+                'type': rrset_type,
+                'ttl': rrset["ttl"],
+                key: decode(rrset["records"]),
+            }
         )
-    rrset["records"] = rrset_records
-    return rrset
+    return records_data
+
+
+def to_selectel_rrset(record):
+    return to_selectel_rrsets((record,))[0]
 
 
 def to_octodns_record_data(rrset):
-    rrset_type = rrset["type"]
-    octodns_record = dict(type=rrset_type, ttl=rrset["ttl"])
-    record_values = []
-    key_for_record_values = "values"
-    if rrset_type in {"A", "AAAA", "NS"}:
-        record_values = [r['content'] for r in rrset["records"]]
-    elif rrset_type in {"CNAME", "ALIAS", "DNAME"}:
-        key_for_record_values = "value"
-        record_values = rrset["records"][0]["content"]
-    elif rrset_type == "TXT":
-        record_values = [
-            escape_semicolon(r['content']).strip('"\'')
-            for r in rrset["records"]
-        ]
-    elif rrset_type == "CAA":
-        for record in rrset["records"]:
-            flag, tag, value = record["content"].split(" ", 2)
-            record_values.append(
-                {'flags': flag, 'tag': tag, 'value': value.strip('"')}
-            )
-    elif rrset_type == "MX":
-        for record in rrset["records"]:
-            preference, exchange = record["content"].split(" ")
-            record_values.append(
-                {'preference': preference, 'exchange': exchange}
-            )
-    elif rrset_type == "SRV":
-        for record in rrset["records"]:
-            priority, weight, port, target = record["content"].split(" ")
-            record_values.append(
-                {
-                    'priority': priority,
-                    'weight': weight,
-                    'port': port,
-                    'target': target,
-                }
-            )
-    elif rrset_type == "SSHFP":
-        for record in rrset["records"]:
-            algorithm, fingerprint_type, fingerprint = record["content"].split(
-                " "
-            )
-            record_values.append(
-                {
-                    'algorithm': algorithm,
-                    'fingerprint_type': fingerprint_type,
-                    'fingerprint': fingerprint,
-                }
-            )
-    else:
-        raise SelectelException(
-            f'DNS Record with type: {rrset_type} not supported'
-        )
-    octodns_record[key_for_record_values] = record_values
-    return octodns_record
+    return to_octodns_records_data((rrset,))[0]
@@ -2,17 +2,50 @@
 #
 #
 
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial
+from itertools import islice
 from logging import getLogger
+from math import ceil
+from threading import RLock
 
 from octodns.idna import idna_decode
 from octodns.provider.base import BaseProvider
-from octodns.record import Record, SshfpRecord, Update
+from octodns.record import Create, Delete, Record, SshfpRecord, Update
 
+from octodns_selectel.session import Deadline
 from octodns_selectel.version import __version__ as provider_version
 
+from . import async_dns_client
+from .async_dns_client import AsyncDNSClientRunner
 from .dns_client import DNSClient
-from .exceptions import ApiException
-from .mappings import to_octodns_record_data, to_selectel_rrset
+from .exceptions import ApiException, ApiNotFoundException, SelectelException
+from .mappings import to_octodns_records_data, to_selectel_rrsets
+from .report import (
+    ZoneReport,
+    current_report,
+    observe,
+    record_change,
+    record_failure,
+    reporting,
+    zone_report,
+)
+from .tracing import get_tracer, start_span
+from .zone_cache import ZoneCache
+
+# What is kept of a server side rrset: enough to address it and to tell
+# whether an update would actually change anything. Contents are sorted, the
+# API doesn't preserve the order of records.
+_CachedRrset = namedtuple('_CachedRrset', ('id', 'ttl', 'contents'))
+# Download of a zone's rrsets in the background and the report of its
+# requests, merged into the report of the populate taking it
+_Prefetch = namedtuple('_Prefetch', ('future', 'report'))
+
+
+def _contents(rrset):
+    return tuple(sorted(record['content'] for record in rrset['records']))
 
 
 class SelectelProvider(BaseProvider):
@@ -33,14 +66,149 @@ class SelectelProvider(BaseProvider):
         )
     )
     MIN_TTL = 60
+    # rrsets are converted to records this many at a time
+    _BATCH_SIZE = 1000
 
-    def __init__(self, id, token, *args, **kwargs):
+    def __init__(
+        self,
+        id,
+        token,
+        pagination_workers=1,
+        max_workers=1,
+        retries=3,
+        retry_backoff=0.5,
+        retry_backoff_max=30.0,
+        retry_after_max=300.0,
+        rate_limit=None,
+        rate_limit_burst=None,
+        zone_cache_dir=None,
+        zone_cache_ttl=3600,
+        pool_connections=10,
+        pool_maxsize=None,
+        connect_timeout=10.0,
+        read_timeout=60.0,
+        deadline=None,
+        rrset_cache=False,
+        new_zone_concurrency=1,
+        report_dir=None,
+        tracing=False,
+        prefetch_zones=False,
+        prefetch_workers=4,
+        *args,
+        **kwargs,
+    ):
         self.log = getLogger(f'SelectelProvider[{id}]')
-        self.log.debug('__init__: id=%s', id)
+        self.log.debug(
+            '__init__: id=%s, pagination_workers=%d, max_workers=%d, '
+            'retries=%d, retry_backoff=%s, retry_backoff_max=%s, '
+            'retry_after_max=%s, '
+            'rate_limit=%s, rate_limit_burst=%s, zone_cache_dir=%s, '
+            'zone_cache_ttl=%d, pool_connections=%d, pool_maxsize=%s, '
+            'connect_timeout=%s, read_timeout=%s, deadline=%s, '
+            'rrset_cache=%s, new_zone_concurrency=%d, report_dir=%s, '
+            'tracing=%s, prefetch_zones=%s, prefetch_workers=%d',
+            id,
+            pagination_workers,
+            max_workers,
+            retries,
+            retry_backoff,
+            retry_backoff_max,
+            retry_after_max,
+            rate_limit,
+            rate_limit_burst,
+            zone_cache_dir,
+            zone_cache_ttl,
+            pool_connections,
+            pool_maxsize,
+            connect_timeout,
+            read_timeout,
+            deadline,
+            rrset_cache,
+            new_zone_concurrency,
+            report_dir,
+            tracing,
+            prefetch_zones,
+            prefetch_workers,
+        )
         super().__init__(id, *args, **kwargs)
-        self._client = DNSClient(provider_version, token)
-        self._zones = self.group_existing_zones_by_name()
+        self.max_workers = max_workers
+        self.new_zone_concurrency = new_zone_concurrency
+        # Shared by the blocking client and the asyncio one
+        client_options = dict(
+            retries=retries,
+            retry_backoff=retry_backoff,
+            retry_backoff_max=retry_backoff_max,
+            retry_after_max=retry_after_max,
+            rate_limit=rate_limit,
+            rate_limit_burst=rate_limit_burst,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            # One budget for every request of the run, whichever client
+            # sends it
+            deadline=Deadline(deadline),
+        )
+        # Requests are only measured when there are reports to write
+        self.report_dir = report_dir
+        if report_dir:
+            client_options['observers'] = [observe]
+        self._tracer = None
+        if tracing:
+            self._tracer = get_tracer()
+            if self._tracer is None:
+                self.log.warning(
+                    'tracing is enabled, but OpenTelemetry API is not '
+                    'installed, install octodns-selectel[tracing]'
+                )
+            client_options['tracer'] = self._tracer
+        self._token = token
+        self._client_options = client_options
+        self._client = DNSClient(
+            provider_version,
+            token,
+            pagination_workers=pagination_workers,
+            pool_connections=pool_connections,
+            # Enough connections for every worker by default, otherwise
+            # they're dropped and re-established all the time
+            pool_maxsize=pool_maxsize
+            or max(
+                10,
+                pagination_workers,
+                max_workers,
+                new_zone_concurrency,
+                prefetch_workers * pagination_workers if prefetch_zones else 0,
+            ),
+            **client_options,
+        )
+        self._zone_cache = None
+        if zone_cache_dir:
+            self._zone_cache = ZoneCache(
+                zone_cache_dir, DNSClient.API_URL, token, zone_cache_ttl
+            )
+        # Zones are discovered lazily: one by one as they are needed, or all
+        # at once when the whole list is asked for. A list loaded from the
+        # on-disk cache may be stale, misses in it are still looked up.
+        # octoDNS may plan zones in parallel threads, the lock keeps this
+        # state consistent, requests are made outside of it.
+        self._zones_lock = RLock()
+        self._zones = {}
+        self._zones_listed = False
+        self._zones_cached = None
+        self._missing_zones = set()
+        # Copies of rrsets are kept up to date by the writes made. With
+        # rrset_cache zones fully listed once aren't listed again. Every zone
+        # has a dict of its own, so parallel operations on different zones
+        # never write to the same one.
+        self.rrset_cache = rrset_cache
         self._zone_rrsets = {}
+        self._listed_zones = set()
+        # Futures of rrsets downloaded in the background by prefetch, each
+        # is taken by the populate of its zone
+        self.prefetch_zones = prefetch_zones
+        self.prefetch_workers = prefetch_workers
+        self._prefetch_executor = None
+        self._prefetched = {}
+        self._auto_prefetched = False
+        self._populated_zones = set()
 
     def _include_change(self, change):
         if isinstance(change, Update):
@@ -60,61 +228,313 @@ class SelectelProvider(BaseProvider):
         return True
 
     def _apply(self, plan):
+        zone_name = idna_decode(plan.desired.name)
+        with zone_report(
+            self.id, zone_name, 'apply', self.report_dir
+        ) as report, start_span(
+            self._tracer,
+            'selectel.apply',
+            {'selectel.zone': zone_name, 'selectel.changes': len(plan.changes)},
+        ):
+            self._apply_plan(plan, report)
+
+    def _apply_plan(self, plan, report):
         desired = plan.desired
         changes = plan.changes
         zone_name = idna_decode(desired.name)
         self.log.debug(
             '_apply: zone=%s, len(changes)=%d', zone_name, len(changes)
         )
-        if not self._is_zone_already_created(zone_name):
+        new_zone = not self._is_zone_already_created(zone_name)
+        if new_zone:
             self.create_zone(zone_name)
         zone_id = self._get_zone_id_by_name(zone_name)
-        for change in changes:
-            action = change.__class__.__name__.lower()
-            if action == 'create':
-                self._apply_create(zone_id, change)
-            if action == 'update':
-                self._apply_update(zone_id, change)
-            if action == 'delete':
+        self._prepare_rrset_ids(desired, zone_id, changes)
+        # Payloads of all the creates and updates are built in one go
+        with report.timed('mapping'):
+            rrsets = iter(
+                to_selectel_rrsets(
+                    change.new
+                    for change in changes
+                    if not isinstance(change, Delete)
+                )
+            )
+        changes = [
+            (change, None if isinstance(change, Delete) else next(rrsets))
+            for change in changes
+        ]
+        if (
+            new_zone
+            and self.new_zone_concurrency > 1
+            and all(isinstance(change, Create) for change, _ in changes)
+        ):
+            self._populate_new_zone(zone_name, zone_id, changes)
+            return
+        if self.max_workers > 1:
+            self._apply_concurrently(zone_id, changes, self.max_workers)
+            return
+        for change, rrset in changes:
+            self._apply_change(zone_id, change, rrset)
+
+    def _populate_new_zone(self, zone_name, zone_id, changes):
+        # The API has no import of a whole zone, so rrsets of a brand-new
+        # zone are created with many requests in flight instead: on an event
+        # loop when httpx is available, in a pool of threads otherwise.
+        self.log.debug(
+            '_populate_new_zone: zone=%s, len(changes)=%d, concurrency=%d',
+            zone_name,
+            len(changes),
+            self.new_zone_concurrency,
+        )
+        if async_dns_client.httpx is None:
+            self._apply_concurrently(
+                zone_id, changes, self.new_zone_concurrency
+            )
+            return
+        runner = AsyncDNSClientRunner(
+            provider_version,
+            self._token,
+            max_concurrency=self.new_zone_concurrency,
+            **self._client_options,
+        )
+        results = runner.run(
+            [
+                partial(self._create_concurrently, zone_id, change, rrset)
+                for change, rrset in changes
+            ]
+        )
+        self._raise_failures(
+            [
+                f'{change}: {result}'
+                for (change, _), result in zip(changes, results)
+                if isinstance(result, Exception)
+            ]
+        )
+
+    async def _create_concurrently(self, zone_id, change, rrset, client):
+        # Counterpart of _apply_change for creates on the event loop
+        with self._change_span(change):
+            created = await client.create_rrset(zone_id, rrset)
+            self._created(idna_decode(change.new.zone.name), rrset, created)
+
+    @staticmethod
+    def _raise_failures(failures):
+        if failures:
+            raise SelectelException(
+                f'Failed to apply {len(failures)} change(s): '
+                + '; '.join(failures)
+            )
+
+    def _prepare_rrset_ids(self, zone, zone_id, changes):
+        # Updates and deletes address rrsets by id. If the zone hasn't been
+        # listed in this run, e.g. the plan came from elsewhere, ids are
+        # looked up name by name unless listing the whole zone takes fewer
+        # requests.
+        zone_name = idna_decode(zone.name)
+        if zone_name in self._listed_zones:
+            return
+        lookups = sum(1 for c in changes if not isinstance(c, Create))
+        if not lookups:
+            return
+        count = self._client.count_rrsets(zone_id)
+        pages = ceil(count / self._client._PAGINATION_LIMIT)
+        self.log.debug(
+            '_prepare_rrset_ids: zone=%s, lookups=%d, pages=%d',
+            zone_name,
+            lookups,
+            pages,
+        )
+        if lookups >= pages:
+            for _ in self.iter_rrsets(zone):
+                pass
+
+    def _change_span(self, change):
+        record = change.record
+        return start_span(
+            self._tracer,
+            'selectel.change',
+            {
+                'selectel.change.action': change.__class__.__name__.lower(),
+                'selectel.rrset.name': record.fqdn,
+                'selectel.rrset.type': record._type,
+            },
+        )
+
+    def _apply_change(self, zone_id, change, rrset):
+        with self._change_span(change):
+            if isinstance(change, Delete):
                 self._apply_delete(zone_id, change)
+            else:
+                action = change.__class__.__name__.lower()
+                getattr(self, f'_apply_{action}')(zone_id, change, rrset)
+
+    def _apply_concurrently(self, zone_id, changes, workers):
+        # Deletes are done first as they may free a node for a create of a
+        # conflicting type, e.g. CNAME in place of A records.
+        deletes = [c for c in changes if isinstance(c[0], Delete)]
+        others = [c for c in changes if not isinstance(c[0], Delete)]
+        with ThreadPoolExecutor(workers) as executor:
+            for batch in (deletes, others):
+                # Each in a copy of the context, so it is reported as well
+                futures = [
+                    executor.submit(
+                        copy_context().run,
+                        self._apply_change,
+                        zone_id,
+                        change,
+                        rrset,
+                    )
+                    for change, rrset in batch
+                ]
+                failures = []
+                for (change, _), future in zip(batch, futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failures.append(f'{change}: {e}')
+                self._raise_failures(failures)
+
+    def _load_cached_zones(self):
+        with self._zones_lock:
+            if self._zones_cached is None:
+                zones = self._zone_cache.load() if self._zone_cache else None
+                self._zones_cached = zones is not None
+                if self._zones_cached:
+                    self.log.debug(
+                        'Zones loaded from %s', self._zone_cache.path
+                    )
+                    self._zones.update(zones)
+            return self._zones_cached
+
+    def _invalidate_zone_cache(self):
+        if self._zone_cache:
+            self.log.debug('Invalidate %s', self._zone_cache.path)
+            self._zone_cache.invalidate()
+
+    def _get_zone(self, zone_name):
+        self._load_cached_zones()
+        with self._zones_lock:
+            if zone_name in self._zones:
+                return self._zones[zone_name]
+            if self._zones_listed or zone_name in self._missing_zones:
+                return None
+        self.log.debug('View zone: %s', zone_name)
+        zone = self._client.get_zone_by_name(zone_name)
+        with self._zones_lock:
+            if zone is None:
+                self._missing_zones.add(zone_name)
+            else:
+                self._zones[zone_name] = zone
+                if self._zones_cached:
+                    # Created after the cache was written
+                    self._invalidate_zone_cache()
+        return zone
 
     def _is_zone_already_created(self, zone_name):
-        return zone_name in self._zones.keys()
+        return self._get_zone(zone_name) is not None
+
+    def _get_cached_rrset(self, zone_name, rrset_type, rrset_name):
+        key = (rrset_name, rrset_type)
+        if (
+            zone_name not in self._listed_zones
+            and key not in self._zone_rrsets.get(zone_name, {})
+        ):
+            self._lookup_rrset(zone_name, rrset_type, rrset_name)
+        try:
+            return self._zone_rrsets[zone_name][key]
+        except KeyError:
+            raise SelectelException(
+                f'rrset {rrset_name} {rrset_type} not found'
+            ) from None
+
+    def _lookup_rrset(self, zone_name, rrset_type, rrset_name):
+        self.log.debug('Find rrset: %s %s', rrset_name, rrset_type)
+        zone_id = self._get_zone_id_by_name(zone_name)
+        self._zone_rrsets.setdefault(zone_name, {})
+        for rrset in self._client.find_rrsets(zone_id, rrset_name, rrset_type):
+            self._index_rrset(zone_name, rrset)
 
     def _get_rrset_id(self, zone_name, rrset_type, rrset_name):
-        return next(
-            filter(
-                lambda rrset: rrset["type"] == rrset_type
-                and rrset["name"] == rrset_name,
-                self._zone_rrsets[zone_name],
-            )
-        )["id"]
+        return self._get_cached_rrset(zone_name, rrset_type, rrset_name).id
+
+    def _index_rrset(self, zone_name, rrset):
+        zone_rrsets = self._zone_rrsets.setdefault(zone_name, {})
+        zone_rrsets[(rrset['name'], rrset['type'])] = _CachedRrset(
+            rrset['id'], rrset['ttl'], _contents(rrset)
+        )
 
-    def _apply_create(self, zone_id, change):
-        new_record = change.new
-        rrset = to_selectel_rrset(new_record)
-        self.create_rrset(zone_id, rrset)
+    def _apply_create(self, zone_id, change, rrset):
+        created = self.create_rrset(zone_id, rrset)
+        self._created(idna_decode(change.new.zone.name), rrset, created)
 
-    def _apply_update(self, zone_id, change):
+    def _created(self, zone_name, rrset, created):
+        # Bookkeeping of a create, whichever way it was made
+        record_change('create')
+        if created.get('id'):
+            # Indexed from what was sent, responses may not echo it all. The
+            # server raises ttl to MIN_TTL, so does the copy.
+            self._index_rrset(
+                zone_name,
+                dict(
+                    rrset, id=created['id'], ttl=max(self.MIN_TTL, rrset['ttl'])
+                ),
+            )
+
+    def _apply_update(self, zone_id, change, rrset):
         existing = change.existing
-        rrset_id = self._get_rrset_id(
+        cached = self._get_cached_rrset(
             idna_decode(existing.zone.name),
             existing._type,
             idna_decode(existing.fqdn),
         )
-        data_for_update = to_selectel_rrset(change.new)
-        self.update_rrset(zone_id, rrset_id, data_for_update)
+        # Only what differs from the server side rrset is sent, changes that
+        # are no-op for the API once normalized aren't sent at all
+        data = {}
+        ttl = max(self.MIN_TTL, rrset['ttl'])
+        if ttl != cached.ttl:
+            data['ttl'] = ttl
+        if _contents(rrset) != cached.contents:
+            data['records'] = rrset['records']
+        if not data:
+            self.log.debug(
+                '_apply_update: skip %s %s, nothing to change',
+                rrset['name'],
+                rrset['type'],
+            )
+            record_change('skip')
+            return
+        if self.update_rrset(zone_id, cached.id, data):
+            record_change('update')
+            self._index_rrset(
+                idna_decode(existing.zone.name),
+                dict(rrset, id=cached.id, ttl=ttl),
+            )
 
     def _apply_delete(self, zone_id, change):
         existing = change.existing
-        rrset_id = self._get_rrset_id(
-            idna_decode(existing.zone.name),
-            existing._type,
-            idna_decode(existing.fqdn),
-        )
-        self.delete_rrset(zone_id, rrset_id)
+        zone_name = idna_decode(existing.zone.name)
+        rrset_name = idna_decode(existing.fqdn)
+        try:
+            rrset_id = self._get_rrset_id(zone_name, existing._type, rrset_name)
+        except SelectelException as e:
+            # Already gone, nothing left to delete
+            self.log.warning(f'Failed to delete rrset. {e}')
+            record_failure(f'delete {rrset_name} {existing._type}: {e}')
+            return
+        if self.delete_rrset(zone_id, rrset_id):
+            record_change('delete')
+            del self._zone_rrsets[zone_name][(rrset_name, existing._type)]
 
     def populate(self, zone, target=False, lenient=False):
+        zone_name = idna_decode(zone.name)
+        with zone_report(
+            self.id, zone_name, 'populate', self.report_dir
+        ) as report, start_span(
+            self._tracer, 'selectel.populate', {'selectel.zone': zone_name}
+        ):
+            return self._populate(zone, target, lenient, report)
+
+    def _populate(self, zone, target, lenient, report):
         zone_name = idna_decode(zone.name)
         self.log.debug(
             'populate: name=%s, target=%s, lenient=%s',
@@ -124,50 +544,199 @@ class SelectelProvider(BaseProvider):
         )
         before = len(zone.records)
         rrsets = []
-        if self._is_zone_already_created(zone_name):
-            rrsets = self.list_rrsets(zone)
-        for rrset in rrsets:
-            rrset_type = rrset['type']
-            if rrset_type in self.SUPPORTS:
-                record_data = to_octodns_record_data(rrset)
-                rrset_hostname = zone.hostname_from_fqdn(rrset['name'])
-                record = Record.new(
-                    zone,
-                    rrset_hostname,
-                    record_data,
-                    source=self,
-                    lenient=lenient,
-                )
-                zone.add_record(record)
+        with self._zones_lock:
+            self._populated_zones.add(zone_name)
+            prefetched = self._prefetched.pop(zone_name, None)
+        if prefetched is not None:
+            self.log.debug('populate: rrsets of %s prefetched', zone_name)
+            try:
+                # Failures of the download are raised here
+                rrsets = prefetched.future.result()
+            finally:
+                report.merge(prefetched.report)
+        elif self.rrset_cache and zone_name in self._listed_zones:
+            self.log.debug('populate: rrsets of %s from cache', zone_name)
+            rrsets = self._cached_rrsets(zone_name)
+        elif self._is_zone_already_created(zone_name):
+            rrsets = self.iter_rrsets(zone)
+        # rrsets are turned into records in batches as pages arrive, so the
+        # whole zone listing is never held in memory at once
+        supported = (r for r in rrsets if r['type'] in self.SUPPORTS)
+        while True:
+            batch = list(islice(supported, self._BATCH_SIZE))
+            if not batch:
+                break
+            with report.timed('mapping'):
+                records_data = to_octodns_records_data(batch)
+            with report.timed('records'):
+                for rrset, record_data in zip(batch, records_data):
+                    rrset_hostname = zone.hostname_from_fqdn(rrset['name'])
+                    record = Record.new(
+                        zone,
+                        rrset_hostname,
+                        record_data,
+                        source=self,
+                        lenient=lenient,
+                    )
+                    zone.add_record(record)
         self.log.info('populate: found %s records', len(zone.records) - before)
-        exists = zone.name in self._zones
+        exists = self._is_zone_already_created(zone_name)
         return exists
 
     def _get_zone_id_by_name(self, zone_name):
-        return self._zones.get(zone_name, False)["id"]
+        return self._get_zone(zone_name)["id"]
 
     def create_zone(self, name):
         self.log.debug('Create zone: %s', name)
         zone = self._client.create_zone(name)
-        self._zones[zone["name"]] = zone
+        with self._zones_lock:
+            self._zones[zone["name"]] = zone
+            self._missing_zones.discard(zone["name"])
+        # Not a full listing, the API adds default SOA and NS rrsets to new
+        # zones, but creates made into it are indexed from now on
+        self._zone_rrsets[zone["name"]] = {}
+        self._invalidate_zone_cache()
         return zone
 
     def list_zones(self):
         # This method is called dynamically in octodns.Manager._preprocess_zones()
         # and required for use of "*" if provider is source.
-        return [zone_name for zone_name in self._zones]
+        # Listed under the lock, lookups of single zones would be wasted
+        # while it is in progress anyway
+        with self._zones_lock:
+            if not self._zones_listed and not self._load_cached_zones():
+                self._zones = self.group_existing_zones_by_name()
+                self._zones_listed = True
+                self._missing_zones.clear()
+                if self._zone_cache:
+                    self._zone_cache.save(self._zones)
+            zone_names = [zone_name for zone_name in self._zones]
+        if self.prefetch_zones:
+            # Only on the first listing and only zones not populated yet,
+            # downloads nobody is going to take would be held in memory and
+            # keep the process from exiting until they are done
+            with self._zones_lock:
+                start = not self._auto_prefetched
+                self._auto_prefetched = True
+            if start:
+                self.prefetch(
+                    [
+                        zone_name
+                        for zone_name in zone_names
+                        if zone_name not in self._populated_zones
+                    ]
+                )
+        return zone_names
+
+    def prefetch(self, zone_names=None):
+        # Starts downloading rrsets of the zones, all of them by default, in
+        # the background, prefetch_workers zones at a time. populate of a
+        # zone then waits for its download rather than listing it again, so
+        # going through a whole account takes about as long as its largest
+        # zone instead of the sum of all of them. Zones already prefetched
+        # and not populated yet are skipped, as are zones listed before with
+        # rrset_cache.
+        if zone_names is None:
+            zone_names = self.list_zones()
+        self.log.debug(
+            'prefetch: len(zone_names)=%d, workers=%d',
+            len(zone_names),
+            self.prefetch_workers,
+        )
+        with self._zones_lock:
+            if self._prefetch_executor is None:
+                self._prefetch_executor = ThreadPoolExecutor(
+                    self.prefetch_workers,
+                    thread_name_prefix=f'SelectelProvider[{self.id}]',
+                )
+            for zone_name in zone_names:
+                if zone_name in self._prefetched or (
+                    self.rrset_cache and zone_name in self._listed_zones
+                ):
+                    continue
+                report = ZoneReport(self.id, zone_name, 'prefetch')
+                future = self._prefetch_executor.submit(
+                    copy_context().run, self._prefetch_zone, zone_name, report
+                )
+                self._prefetched[zone_name] = _Prefetch(future, report)
+
+    def _prefetch_zone(self, zone_name, report):
+        with reporting(report), start_span(
+            self._tracer, 'selectel.prefetch', {'selectel.zone': zone_name}
+        ):
+            if not self._is_zone_already_created(zone_name):
+                return []
+            return list(self._iter_indexed_rrsets(zone_name))
+
+    def close(self):
+        # Stops prefetching: downloads not started yet are cancelled, those
+        # in progress finish in the background and are dropped. prefetch
+        # starts a new executor if called again.
+        with self._zones_lock:
+            executor, self._prefetch_executor = self._prefetch_executor, None
+            self._prefetched = {}
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
 
     def group_existing_zones_by_name(self):
         self.log.debug('View zones')
         return {zone['name']: zone for zone in self._client.list_zones()}
 
-    def list_rrsets(self, zone):
-        zone_name = idna_decode(zone.name)
+    def iter_rrsets(self, zone):
+        return self._iter_indexed_rrsets(idna_decode(zone.name))
+
+    def _iter_indexed_rrsets(self, zone_name):
         self.log.debug('View rrsets. Zone: %s', zone_name)
-        zone_id = self._get_zone_id_by_name(zone_name)
-        zone_rrsets = self._client.list_rrsets(zone_id)
-        self._zone_rrsets[zone_name] = zone_rrsets
-        return zone_rrsets
+        # Only slim copies of rrsets are kept around, indexed by (name, type)
+        self._zone_rrsets[zone_name] = {}
+        self._listed_zones.discard(zone_name)
+        report = current_report()
+        for rrset in self._iter_zone_rrsets(zone_name):
+            if report is not None:
+                report.rrsets_listed += 1
+            if rrset['type'] in self.SUPPORTS:
+                self._index_rrset(zone_name, rrset)
+            yield rrset
+        self._listed_zones.add(zone_name)
+
+    def _cached_rrsets(self, zone_name):
+        for (name, rrset_type), cached in self._zone_rrsets[zone_name].items():
+            yield dict(
+                id=cached.id,
+                name=name,
+                type=rrset_type,
+                ttl=cached.ttl,
+                records=[dict(content=content) for content in cached.contents],
+            )
+
+    def _iter_zone_rrsets(self, zone_name):
+        report = current_report()
+        on_page = None if report is None else report.page
+        rrsets = self._client.iter_rrsets(
+            self._get_zone_id_by_name(zone_name), on_page
+        )
+        try:
+            first = next(rrsets, None)
+        except ApiNotFoundException:
+            if not self._zones_cached:
+                raise
+            # Zone id came from the on-disk cache, but the zone has been
+            # deleted or re-created since then
+            self.log.info('Zone %s not found by cached id', zone_name)
+            self._invalidate_zone_cache()
+            with self._zones_lock:
+                self._zones.pop(zone_name, None)
+            if not self._is_zone_already_created(zone_name):
+                return
+            zone_id = self._get_zone_id_by_name(zone_name)
+            rrsets = self._client.iter_rrsets(zone_id, on_page)
+            first = next(rrsets, None)
+        if first is not None:
+            yield first
+            yield from rrsets
+
+    def list_rrsets(self, zone):
+        return list(self.iter_rrsets(zone))
 
     def create_rrset(self, zone_id, data):
         self.log.debug('Create rrset. Zone id: %s, data %s', zone_id, data)
@@ -183,6 +752,9 @@ class SelectelProvider(BaseProvider):
             self.log.warning(
                 f'Failed to update rrset {rrset_id}. {api_exception}'
             )
+            record_failure(f'update {rrset_id}: {api_exception}')
+            return False
+        return True
 
     def delete_rrset(self, zone_id, rrset_id):
         self.log.debug(
@@ -194,3 +766,6 @@ class SelectelProvider(BaseProvider):
             self.log.warning(
                 f'Failed to delete rrset {rrset_id}. {api_exception}'
             )
+            record_failure(f'delete {rrset_id}: {api_exception}')
+            return False
+        return True
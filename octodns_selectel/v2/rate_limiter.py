@@ -0,0 +1,44 @@
+from hashlib import sha256
+from threading import Lock
+from time import monotonic, sleep
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated_at = monotonic()
+        self._lock = Lock()
+
+    def reserve(self):
+        # Takes a token and returns how long to wait before it may be used.
+        # Tokens are allowed to go negative, this way waiting callers are
+        # queued in the order they came instead of racing for each refill.
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            self._tokens -= 1
+            return max(0, -self._tokens / self.rate)
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay:
+            sleep(delay)
+
+
+_buckets = {}
+_buckets_lock = Lock()
+
+
+def get_rate_limiter(token: str, rate: float, burst: int):
+    # All clients using the same token share the API quota, so they share
+    # the bucket as well. The first client to ask for it sets its limits.
+    key = sha256(token.encode()).hexdigest()
+    with _buckets_lock:
+        if key not in _buckets:
+            _buckets[key] = TokenBucket(rate, burst)
+        return _buckets[key]
@@ -0,0 +1,171 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from json import dump
+from os import makedirs, replace
+from os.path import join
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from time import perf_counter
+
+from .instrumentation import RequestStats
+
+# Report of the populate or apply in progress. It's a context variable, so
+# requests made from worker threads and event loops started on behalf of an
+# operation are attributed to it, even with several zones processed at once.
+_current = ContextVar('selectel_report', default=None)
+
+
+def current_report():
+    return _current.get()
+
+
+def observe(event):
+    # Request observer feeding the report of the operation in progress
+    report = _current.get()
+    if report is not None:
+        report.request(event)
+
+
+def record_change(action):
+    report = _current.get()
+    if report is not None:
+        report.change(action)
+
+
+def record_failure(message):
+    report = _current.get()
+    if report is not None:
+        report.failure(message)
+
+
+class ZoneReport:
+    def __init__(self, provider_id, zone_name, operation):
+        self.provider_id = provider_id
+        self.zone_name = zone_name
+        self.operation = operation
+        self.started_at = datetime.now(timezone.utc)
+        self.wall_time = 0
+        self.error = None
+        self.rrsets_listed = 0
+        self.pages = 0
+        self.changes = Counter()
+        self.failures = []
+        self.timings = Counter()
+        self.network_time = 0
+        self.stats = RequestStats()
+        self._lock = Lock()
+
+    def request(self, event):
+        self.stats(event)
+        with self._lock:
+            self.network_time += event.latency
+
+    def page(self, rrsets):
+        # Pages of the zone's rrsets listing, lookups of single rrsets and
+        # counts aren't pages of it
+        with self._lock:
+            self.pages += 1
+
+    def change(self, action):
+        with self._lock:
+            self.changes[action] += 1
+
+    def failure(self, message):
+        with self._lock:
+            self.failures.append(message)
+
+    def merge(self, other):
+        # Takes in the requests and rrsets of work done for this operation
+        # under a report of its own, e.g. a zone prefetched in the background
+        self.stats.update(other.stats)
+        with other._lock:
+            rrsets_listed = other.rrsets_listed
+            pages = other.pages
+            network_time = other.network_time
+            timings = Counter(other.timings)
+        with self._lock:
+            self.rrsets_listed += rrsets_listed
+            self.pages += pages
+            self.network_time += network_time
+            self.timings.update(timings)
+
+    @contextmanager
+    def timed(self, name):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - started
+            with self._lock:
+                self.timings[name] += elapsed
+
+    def to_dict(self):
+        endpoints = self.stats.summary()
+        return dict(
+            provider=self.provider_id,
+            zone=self.zone_name,
+            operation=self.operation,
+            started_at=self.started_at.isoformat(),
+            wall_time=self.wall_time,
+            error=self.error,
+            rrsets_listed=self.rrsets_listed,
+            pages=self.pages,
+            changes=dict(self.changes),
+            api_calls=sum(e['calls'] for e in endpoints.values()),
+            retries=sum(e['retries'] for e in endpoints.values()),
+            request_bytes=sum(e['request_bytes'] for e in endpoints.values()),
+            response_bytes=sum(e['response_bytes'] for e in endpoints.values()),
+            time=dict(
+                network=self.network_time,
+                mapping=self.timings['mapping'],
+                records=self.timings['records'],
+            ),
+            failures=self.failures,
+            endpoints=endpoints,
+        )
+
+    def write(self, directory):
+        makedirs(directory, exist_ok=True)
+        started_at = self.started_at.strftime('%Y%m%dT%H%M%S.%fZ')
+        path = join(
+            directory,
+            f'{self.zone_name.rstrip(".")}-{self.operation}-{started_at}.json',
+        )
+        # Written aside and moved in place, so whatever picks reports up
+        # never reads a partially written one
+        with NamedTemporaryFile(
+            'w', dir=directory, suffix='.tmp', delete=False
+        ) as fh:
+            dump(self.to_dict(), fh, indent=2)
+        replace(fh.name, path)
+        return path
+
+
+@contextmanager
+def reporting(report):
+    # Makes report the one of the operation in progress
+    token = _current.set(report)
+    try:
+        yield report
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def zone_report(provider_id, zone_name, operation, directory=None):
+    # Collects the report of an operation, written to directory if there's
+    # one, also when the operation fails
+    report = ZoneReport(provider_id, zone_name, operation)
+    started = perf_counter()
+    try:
+        with reporting(report):
+            yield report
+    except Exception as e:
+        report.error = str(e)
+        raise
+    finally:
+        report.wall_time = perf_counter() - started
+        if directory:
+            report.write(directory)
@@ -0,0 +1,36 @@
+from contextlib import nullcontext
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+from octodns_selectel.version import __version__ as provider_version
+
+from .instrumentation import path_template
+
+
+def get_tracer():
+    # None without the OpenTelemetry API, nothing is traced then. Spans go
+    # wherever the tracer provider set up by the application sends them.
+    if trace is None:
+        return None
+    return trace.get_tracer('octodns_selectel', provider_version)
+
+
+def start_span(tracer, name, attributes=None):
+    if tracer is None:
+        return nullcontext()
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+
+def request_span(tracer, method, path, params):
+    attributes = {
+        'http.request.method': method,
+        'url.template': path_template(path),
+    }
+    if params and 'offset' in params:
+        attributes['selectel.page.offset'] = params['offset']
+    return tracer.start_as_current_span(
+        'selectel.request', kind=trace.SpanKind.CLIENT, attributes=attributes
+    )
@@ -0,0 +1,42 @@
+from hashlib import sha256
+from json import dump, load
+from os import makedirs, remove, replace
+from os.path import join
+from tempfile import NamedTemporaryFile
+from time import time
+
+
+class ZoneCache:
+    def __init__(self, directory: str, api_url: str, token: str, ttl: int):
+        # The token is part of the key as different tokens may belong to
+        # different projects, it's hashed to not leave it on disk as is
+        key = sha256(f'{api_url}\n{token}'.encode()).hexdigest()
+        self.directory = directory
+        self.path = join(directory, f'selectel-zones-{key}.json')
+        self.ttl = ttl
+
+    def load(self):
+        try:
+            with open(self.path) as fh:
+                cached = load(fh)
+        except (OSError, ValueError):
+            return None
+        if time() - cached['cached_at'] > self.ttl:
+            return None
+        return cached['zones']
+
+    def save(self, zones):
+        makedirs(self.directory, exist_ok=True)
+        # Written aside and moved in place, so concurrent runs never read a
+        # partially written file
+        with NamedTemporaryFile(
+            'w', dir=self.directory, suffix='.tmp', delete=False
+        ) as fh:
+            dump(dict(cached_at=time(), zones=zones), fh)
+        replace(fh.name, self.path)
+
+    def invalidate(self):
+        try:
+            remove(self.path)
+        except FileNotFoundError:
+            pass
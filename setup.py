@@ -20,13 +20,21 @@ def version():
 
 description, long_description = descriptions()
 
-tests_require = ('pytest', 'pytest-cov', 'pytest-network', 'requests_mock')
+tests_require = (
+    'httpx',
+    'opentelemetry-sdk',
+    'pytest',
+    'pytest-cov',
+    'pytest-network',
+    'requests_mock',
+)
 
 setup(
     author='Ross McFarland',
     author_email='rwmcfa1@gmail.com',
     description=description,
     extras_require={
+        'async': ('httpx>=0.23.0',),
         'dev': tests_require
         + (
             # we need to manually/explicitely bump major versions as they're
@@ -43,6 +51,7 @@ setup(
             'twine>=3.4.2',
         ),
         'test': tests_require,
+        'tracing': ('opentelemetry-api>=1.0.0',),
     },
     install_requires=('octodns>=1.5.0', 'requests>=2.27.0'),
     license='MIT',
@@ -0,0 +1,91 @@
+#
+# Micro-benchmark of v2 record <-> rrset conversions, per record type.
+#
+#   python -m tests.benchmarks.bench_mappings --count 100000
+#
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+from octodns.record import Record
+from octodns.zone import Zone
+
+from octodns_selectel.v2.mappings import (
+    to_octodns_record_data,
+    to_octodns_records_data,
+    to_selectel_rrset,
+    to_selectel_rrsets,
+)
+
+ZONE = Zone('bench.com.', [])
+DATA = {
+    'A': dict(values=['10.0.0.1', '10.0.0.2']),
+    'AAAA': dict(values=['2001:db8::1']),
+    'NS': dict(values=['ns1.bench.com.', 'ns2.bench.com.']),
+    'CNAME': dict(value='target.bench.com.'),
+    'TXT': dict(values=['v=spf1 -all', 'some\\;value']),
+    'CAA': dict(values=[dict(flags=0, tag='issue', value='ca.example.net')]),
+    'MX': dict(
+        values=[
+            dict(preference=10, exchange='mx1.bench.com.'),
+            dict(preference=20, exchange='mx2.bench.com.'),
+        ]
+    ),
+    'SRV': dict(
+        values=[
+            dict(priority=10, weight=20, port=5060, target='sip.bench.com.')
+        ]
+    ),
+    'SSHFP': dict(
+        values=[
+            dict(
+                algorithm=1,
+                fingerprint_type=1,
+                fingerprint='bf6b6825d2977c511a475bbefb88aad54a92ac73',
+            )
+        ]
+    ),
+}
+
+
+def _rate(count, func, items):
+    # Results are kept, like the batch functions do, for a fair comparison
+    start = perf_counter()
+    [func(item) for item in items]
+    return count / (perf_counter() - start)
+
+
+def _batch_rate(count, func, items):
+    start = perf_counter()
+    func(items)
+    return count / (perf_counter() - start)
+
+
+def main(argv=None):
+    parser = ArgumentParser()
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--types', nargs='+', default=list(DATA))
+    args = parser.parse_args(argv)
+
+    print(
+        f'{"type":>6} {"encode/s":>12} {"decode/s":>12} '
+        f'{"batch enc/s":>12} {"batch dec/s":>12}'
+    )
+    for rrset_type in args.types:
+        record = Record.new(
+            ZONE, '_sip._tcp', dict(DATA[rrset_type], type=rrset_type, ttl=60)
+        )
+        records = [record] * args.count
+        rrsets = [to_selectel_rrset(record)] * args.count
+        encode = _rate(args.count, to_selectel_rrset, records)
+        decode = _rate(args.count, to_octodns_record_data, rrsets)
+        batch_encode = _batch_rate(args.count, to_selectel_rrsets, records)
+        batch_decode = _batch_rate(args.count, to_octodns_records_data, rrsets)
+        print(
+            f'{rrset_type:>6} {encode:12.0f} {decode:12.0f} '
+            f'{batch_encode:12.0f} {batch_decode:12.0f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
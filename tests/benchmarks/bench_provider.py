@@ -0,0 +1,302 @@
+#
+# End-to-end benchmark of SelectelProvider (v2) against the local fake API.
+#
+#   python -m tests.benchmarks.bench_provider --sizes 1000 10000 100000
+#
+# Every scenario runs in a fresh process so its peak RSS is its own. Results
+# are compared against tests/benchmarks/baseline.json, any scenario slower,
+# hungrier or chattier than the baseline allows makes the run fail.
+#
+
+import tracemalloc
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from json import dump, load
+from multiprocessing import get_context
+from os.path import dirname, join
+from resource import RUSAGE_SELF, getrusage
+from sys import exit
+from time import perf_counter
+
+from octodns.record import Record
+from octodns.zone import Zone
+
+from octodns_selectel.v2.dns_client import BaseDNSClient
+from octodns_selectel.v2.provider import SelectelProvider
+from tests.fake_api_server import FakeSelectelApi
+
+BASELINE = join(dirname(__file__), 'baseline.json')
+SCENARIOS = ('populate', 'apply', 'provision', 'zones')
+# rrsets in each of the zones of the zones scenario
+ZONE_RRSETS = 20
+
+
+def _zone_name(size):
+    return f'bench-{size}.com.'
+
+
+def _rrsets(size, changed=False):
+    # Same set of (hostname, data) as desired (changed) or as existing on the
+    # server: a tenth of rrsets get a new TTL, a hundredth are removed and as
+    # many are added.
+    for i in range(size + (size // 100 if changed else 0)):
+        if changed and i % 100 == 1:
+            continue
+        if changed and i >= size:
+            hostname = f'new-{i}'
+        else:
+            hostname = f'host-{i}'
+        ttl = 3600 if not changed or i % 10 else 7200
+        if i % 2:
+            data = dict(type='TXT', ttl=ttl, values=[f'value-{i}'])
+        else:
+            data = dict(
+                type='A',
+                ttl=ttl,
+                values=[f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}'],
+            )
+        yield hostname, data
+
+
+def _account_zone_name(i):
+    return f'account-{i}.com.'
+
+
+def _seed(api, size, zone_name=None):
+    zone_name = zone_name or _zone_name(size)
+    zone_id = api.add_zone(zone_name)['id']
+    for hostname, data in _rrsets(size):
+        contents = data['values']
+        if data['type'] == 'TXT':
+            contents = [f'"{value}"' for value in contents]
+        api.add_rrset(
+            zone_id,
+            f'{hostname}.{zone_name}',
+            data['type'],
+            data['ttl'],
+            contents,
+        )
+
+
+def _provider(url, options):
+    # Runs in a process of its own, so the API is redirected for all clients
+    BaseDNSClient.API_URL = url
+    return SelectelProvider('bench', 'token', **options)
+
+
+def _peak_rss_kb():
+    # ru_maxrss survives exec on Linux, so a spawned process would report the
+    # peak of the benchmark process that started it. VmHWM is its own.
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return getrusage(RUSAGE_SELF).ru_maxrss
+
+
+def _run_scenario(url, scenario, size, options, trace):
+    options = dict(options)
+    zone_workers = options.pop('zone_workers', 1)
+    prefetch = options.pop('prefetch_workers', 0)
+    if prefetch:
+        options['prefetch_workers'] = prefetch
+    provider = _provider(url, options)
+    zone_name = _zone_name(size)
+    plan = None
+    if scenario == 'zones':
+        # Many small zones planned at once by octoDNS workers
+        if trace:
+            tracemalloc.start()
+        start = perf_counter()
+        if prefetch:
+            provider.prefetch([_account_zone_name(i) for i in range(size)])
+        with ThreadPoolExecutor(zone_workers) as executor:
+            list(
+                executor.map(
+                    lambda i: provider.populate(
+                        Zone(_account_zone_name(i), [])
+                    ),
+                    range(size),
+                )
+            )
+        return _result(provider, perf_counter() - start, trace)
+    if scenario == 'apply':
+        desired = Zone(zone_name, [])
+        for hostname, data in _rrsets(size, changed=True):
+            desired.add_record(Record.new(desired, hostname, data))
+        plan = provider.plan(desired)
+    elif scenario == 'provision':
+        # All of the rrsets into a zone that doesn't exist yet
+        desired = Zone(f'new-{zone_name}', [])
+        for hostname, data in _rrsets(size):
+            desired.add_record(Record.new(desired, hostname, data))
+        plan = provider.plan(desired)
+    if trace:
+        tracemalloc.start()
+    start = perf_counter()
+    if plan is None:
+        zone = Zone(zone_name, [])
+        provider.populate(zone)
+    else:
+        provider.apply(plan)
+    return _result(provider, perf_counter() - start, trace)
+
+
+def _result(provider, wall_time, trace):
+    result = dict(
+        wall_time=round(wall_time, 3),
+        peak_rss_kb=_peak_rss_kb(),
+        retries=provider._client.retry_count,
+    )
+    if trace:
+        result['traced_peak_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+    return result
+
+
+def _check(name, result, baseline, tolerance):
+    failures = []
+    expected = baseline.get(name)
+    if expected is None:
+        return failures
+    if result['requests'] > expected['requests']:
+        failures.append(
+            f'{name}: {result["requests"]} requests, '
+            f'baseline {expected["requests"]}'
+        )
+    for metric in ('wall_time', 'peak_rss_kb'):
+        limit = expected[metric] * (1 + tolerance)
+        if result[metric] > limit:
+            failures.append(
+                f'{name}: {metric} {result[metric]}, '
+                f'baseline {expected[metric]} (+{tolerance:.0%})'
+            )
+    return failures
+
+
+def main(argv=None):
+    parser = ArgumentParser()
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[1000, 10000, 100000]
+    )
+    parser.add_argument(
+        '--scenarios',
+        nargs='+',
+        choices=SCENARIOS,
+        default=['populate', 'apply'],
+    )
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--pagination-workers', type=int, default=1)
+    parser.add_argument('--max-workers', type=int, default=1)
+    parser.add_argument('--new-zone-concurrency', type=int, default=1)
+    parser.add_argument(
+        '--zones',
+        type=int,
+        default=800,
+        help=f'Number of zones of {ZONE_RRSETS} rrsets in the zones scenario',
+    )
+    parser.add_argument(
+        '--zone-workers',
+        type=int,
+        default=1,
+        help='Number of zones populated at once in the zones scenario',
+    )
+    parser.add_argument(
+        '--prefetch-workers',
+        type=int,
+        default=0,
+        help='Prefetch rrsets of the zones scenario with that many workers',
+    )
+    parser.add_argument('--tracemalloc', action='store_true')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    parser.add_argument(
+        '--save-baseline',
+        action='store_true',
+        help='Store the results as the new baseline instead of checking them',
+    )
+    args = parser.parse_args(argv)
+
+    options = dict(
+        pagination_workers=args.pagination_workers,
+        max_workers=args.max_workers,
+        new_zone_concurrency=args.new_zone_concurrency,
+        retry_backoff=0.01,
+    )
+    runs = [
+        (scenario, size)
+        for size in args.sizes
+        for scenario in args.scenarios
+        if scenario != 'zones'
+    ]
+    if 'zones' in args.scenarios:
+        runs.append(('zones', args.zones))
+    results = {}
+    with FakeSelectelApi(
+        latency=args.latency, error_rate=args.error_rate
+    ) as api:
+        for size in args.sizes:
+            _seed(api, size)
+        if 'zones' in args.scenarios:
+            for i in range(args.zones):
+                _seed(api, ZONE_RRSETS, _account_zone_name(i))
+        for scenario, size in runs:
+            name = f'{scenario}-{size}'
+            api.reset_stats()
+            scenario_options = options
+            if scenario == 'zones':
+                scenario_options = dict(
+                    options,
+                    zone_workers=args.zone_workers,
+                    prefetch_workers=args.prefetch_workers,
+                )
+            # A fresh process per scenario, otherwise ru_maxrss would be
+            # the peak of everything run before it
+            with ProcessPoolExecutor(
+                1, mp_context=get_context('spawn')
+            ) as executor:
+                result = executor.submit(
+                    _run_scenario,
+                    api.url,
+                    scenario,
+                    size,
+                    scenario_options,
+                    args.tracemalloc,
+                ).result()
+            result['requests'] = sum(api.requests.values())
+            results[name] = result
+            print(
+                f'{name:>16}: {result["wall_time"]:8.3f}s '
+                f'{result["requests"]:7d} requests '
+                f'{result["peak_rss_kb"]:8d}KiB peak RSS'
+                + (
+                    f' {result["traced_peak_kb"]:8d}KiB traced'
+                    if args.tracemalloc
+                    else ''
+                )
+            )
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as fh:
+            dump(results, fh, indent=2, sort_keys=True)
+            fh.write('\n')
+        return 0
+
+    try:
+        with open(args.baseline) as fh:
+            baseline = load(fh)
+    except FileNotFoundError:
+        baseline = {}
+    failures = []
+    for name, result in results.items():
+        failures.extend(_check(name, result, baseline, args.tolerance))
+    for failure in failures:
+        print(f'REGRESSION {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,239 @@
+import re
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps, loads
+from random import Random
+from threading import Lock, Thread
+from time import sleep
+from urllib.parse import parse_qs, urlparse
+from uuid import uuid4
+
+# Local stand-in for the parts of Selectel DNS v2 API used by the provider:
+# /zones and /zones/{id}/rrset with offset pagination, plus knobs for latency
+# and injected failures. Meant for end-to-end tests and benchmarks, requests
+# really go over the loopback interface.
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for plenty of clients connecting at once
+    request_queue_size = 128
+
+
+class FakeSelectelApi:
+    PREFIX = '/domains/v2'
+    PAGINATION_MAX = 1000
+
+    _routes = (
+        ('/zones', re.compile(r'^/zones$')),
+        ('/zones/{id}/rrset', re.compile(r'^/zones/(?P<zone_id>[^/]+)/rrset$')),
+        (
+            '/zones/{id}/rrset/{id}',
+            re.compile(
+                r'^/zones/(?P<zone_id>[^/]+)/rrset/(?P<rrset_id>[^/]+)$'
+            ),
+        ),
+    )
+
+    def __init__(self, latency=0, error_rate=0, error_status=503, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.zones = {}
+        self.rrsets = {}
+        # (name, type) of rrsets by zone id, to spot conflicting creates
+        self._rrset_keys = {}
+        self.requests = Counter()
+        self._failures = []
+        self._random = Random(seed)
+        self._lock = Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}{self.PREFIX}'
+
+    def start(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = loads(self.rfile.read(length)) if length else None
+                status, headers, payload = api.handle(
+                    self.command, self.path, body
+                )
+                data = dumps(payload).encode() if payload is not None else b''
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+        self._server = _Server(('127.0.0.1', 0), Handler)
+        Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    # Data
+
+    def add_zone(self, name):
+        zone = dict(id=str(uuid4()), name=name)
+        with self._lock:
+            self._add_zone(zone)
+        return zone
+
+    def add_rrset(self, zone_id, name, type, ttl, contents):
+        rrset = dict(
+            id=str(uuid4()),
+            zone_id=zone_id,
+            name=name,
+            type=type,
+            ttl=ttl,
+            records=[dict(content=c, disabled=False) for c in contents],
+        )
+        with self._lock:
+            self._add_rrset(rrset)
+        return rrset
+
+    def _add_zone(self, zone):
+        self.zones[zone['id']] = zone
+        self.rrsets[zone['id']] = {}
+        self._rrset_keys[zone['id']] = set()
+
+    def _add_rrset(self, rrset):
+        self.rrsets[rrset['zone_id']][rrset['id']] = rrset
+        self._rrset_keys[rrset['zone_id']].add((rrset['name'], rrset['type']))
+
+    def fail_next(self, status, times=1, retry_after=None, route=None):
+        # Queue failures that are served before anything else, to requests
+        # of the given route template only if any, e.g. '/zones/{id}/rrset'
+        headers = (
+            {'Retry-After': str(retry_after)} if retry_after is not None else {}
+        )
+        with self._lock:
+            self._failures.extend([(status, headers, route)] * times)
+
+    def transport(self):
+        # httpx transport serving requests in process, without sockets
+        import httpx
+
+        def handler(request):
+            body = loads(request.content) if request.content else None
+            status, headers, payload = self.handle(
+                request.method, request.url.raw_path.decode(), body
+            )
+            return httpx.Response(status, headers=headers, json=payload)
+
+        return httpx.MockTransport(handler)
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests.clear()
+
+    # Requests
+
+    def handle(self, method, raw_path, body):
+        url = urlparse(raw_path)
+        path = url.path[len(self.PREFIX) :]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        for template, pattern in self._routes:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return 404, {}, dict(error='not_found')
+        with self._lock:
+            self.requests[(method, template)] += 1
+            failure = None
+            for i, (_, _, route) in enumerate(self._failures):
+                if route in (None, template):
+                    failure = self._failures.pop(i)
+                    break
+            if failure is None and self._random.random() < self.error_rate:
+                failure = (self.error_status, {}, None)
+        if self.latency:
+            sleep(self.latency)
+        if failure:
+            return failure[0], failure[1], dict(error='injected')
+        handler = getattr(self, f'_{method.lower()}_{template.count("{")}')
+        with self._lock:
+            return handler(query, body, **match.groupdict())
+
+    def _page(self, items, query):
+        limit = min(int(query.get('limit', 100)), self.PAGINATION_MAX)
+        offset = int(query.get('offset', 0))
+        if query.get('sort_by') == 'name.descend':
+            items = sorted(items, key=lambda i: i['name'], reverse=True)
+        next_offset = offset + limit if offset + limit < len(items) else 0
+        return dict(
+            count=len(items),
+            next_offset=next_offset,
+            result=items[offset : offset + limit],
+        )
+
+    def _get_0(self, query, body):
+        zones = list(self.zones.values())
+        if 'filter' in query:
+            zones = [z for z in zones if query['filter'] in z['name']]
+        return 200, {}, self._page(zones, query)
+
+    def _post_0(self, query, body):
+        if any(z['name'] == body['name'] for z in self.zones.values()):
+            return 409, {}, dict(error='zone_already_exists')
+        zone = dict(id=str(uuid4()), name=body['name'])
+        self._add_zone(zone)
+        return 201, {}, zone
+
+    def _get_1(self, query, body, zone_id):
+        if zone_id not in self.zones:
+            return 404, {}, dict(error='zone_not_found')
+        rrsets = list(self.rrsets[zone_id].values())
+        if 'search' in query:
+            rrsets = [r for r in rrsets if query['search'] in r['name']]
+        if 'rrset_types' in query:
+            rrsets = [r for r in rrsets if r['type'] == query['rrset_types']]
+        return 200, {}, self._page(rrsets, query)
+
+    def _post_1(self, query, body, zone_id):
+        if zone_id not in self.zones:
+            return 404, {}, dict(error='zone_not_found')
+        if (body['name'], body['type']) in self._rrset_keys[zone_id]:
+            return 409, {}, dict(error='rrset_already_exists')
+        rrset = dict(body, id=str(uuid4()), zone_id=zone_id)
+        self._add_rrset(rrset)
+        return 201, {}, rrset
+
+    def _patch_2(self, query, body, zone_id, rrset_id):
+        rrset = self.rrsets.get(zone_id, {}).get(rrset_id)
+        if rrset is None:
+            return 404, {}, dict(error='rrset_not_found')
+        rrset.update(body)
+        return 204, {}, None
+
+    def _delete_2(self, query, body, zone_id, rrset_id):
+        rrset = self.rrsets.get(zone_id, {}).pop(rrset_id, None)
+        if rrset is None:
+            return 404, {}, dict(error='rrset_not_found')
+        self._rrset_keys[zone_id].discard((rrset['name'], rrset['type']))
+        return 204, {}, None
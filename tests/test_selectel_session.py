@@ -0,0 +1,51 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from octodns_selectel.session import Deadline, DeadlineExceeded, build_session
+
+
+class TestSelectelSession(TestCase):
+    def test_build_session(self):
+        sess = build_session(
+            {'X-Token': 'token'}, pool_connections=3, pool_maxsize=30
+        )
+        self.assertEqual('token', sess.headers['X-Token'])
+        for prefix in ('https://', 'http://'):
+            adapter = sess.get_adapter(f'{prefix}api.selectel.ru')
+            self.assertEqual(3, adapter._pool_connections)
+            self.assertEqual(30, adapter._pool_maxsize)
+
+    def test_no_deadline(self):
+        self.assertEqual((3, 10), Deadline().timeout(3, 10))
+
+    @patch('octodns_selectel.session.monotonic')
+    def test_deadline(self, fake_monotonic):
+        deadline = Deadline(60)
+        # the clock starts with the first request
+        fake_monotonic.return_value = 100
+        self.assertEqual((3, 10), deadline.timeout(3, 10))
+        fake_monotonic.return_value = 155
+        self.assertEqual((3, 5), deadline.timeout(3, 10))
+        fake_monotonic.return_value = 159
+        self.assertEqual((1, 1), deadline.timeout(3, 10))
+        fake_monotonic.return_value = 160
+        with self.assertRaises(DeadlineExceeded) as ctx:
+            deadline.timeout(3, 10)
+        self.assertEqual('Deadline of 60s exceeded', str(ctx.exception))
+
+    @patch('octodns_selectel.session.monotonic')
+    def test_check_wait(self, fake_monotonic):
+        self.assertIsNone(Deadline().remaining())
+        self.assertEqual(600, Deadline().check_wait(600))
+        deadline = Deadline(60)
+        fake_monotonic.return_value = 100
+        self.assertEqual(60, deadline.remaining())
+        self.assertEqual(30, deadline.check_wait(30))
+        fake_monotonic.return_value = 130
+        self.assertEqual(29.5, deadline.check_wait(29.5))
+        with self.assertRaises(DeadlineExceeded) as ctx:
+            deadline.check_wait(30)
+        self.assertEqual(
+            'Deadline of 60s exceeded, 30.00s left to wait 30.00s',
+            str(ctx.exception),
+        )
@@ -316,13 +316,6 @@ class TestSelectelProvider(TestCase):
             f'{self.API_URL}/unit.tests/records/', json=self.api_record
         )
         fake_http.get(f'{self.API_URL}/', json=self.domain)
-        fake_http.head(
-            f'{self.API_URL}/unit.tests/records/',
-            headers={'X-Total-Count': str(len(self.api_record))},
-        )
-        fake_http.head(
-            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
-        )
 
         provider = SelectelProvider(123, 'secret_token')
         provider.populate(zone)
@@ -347,13 +340,6 @@ class TestSelectelProvider(TestCase):
         zone = Zone('unit.tests.', [])
         fake_http.get(f'{self.API_URL}/unit.tests/records/', json=more_record)
         fake_http.get(f'{self.API_URL}/', json=self.domain)
-        fake_http.head(
-            f'{self.API_URL}/unit.tests/records/',
-            headers={'X-Total-Count': str(len(self.api_record))},
-        )
-        fake_http.head(
-            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
-        )
 
         zone.add_record(
             Record.new(
@@ -383,13 +369,6 @@ class TestSelectelProvider(TestCase):
     def test_apply(self, fake_http):
         fake_http.get(f'{self.API_URL}/unit.tests/records/', json=list())
         fake_http.get(f'{self.API_URL}/', json=self.domain)
-        fake_http.head(
-            f'{self.API_URL}/unit.tests/records/',
-            headers={'X-Total-Count': '0'},
-        )
-        fake_http.head(
-            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
-        )
         fake_http.post(f'{self.API_URL}/100000/records/', json=list())
 
         provider = SelectelProvider(123, 'test_token', strict_supports=False)
@@ -406,9 +385,6 @@ class TestSelectelProvider(TestCase):
     @requests_mock.Mocker()
     def test_domain_list(self, fake_http):
         fake_http.get(f'{self.API_URL}/', json=self.domain)
-        fake_http.head(
-            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
-        )
 
         expected = {'unit.tests': self.domain[0]}
         provider = SelectelProvider(123, 'test_token')
@@ -419,9 +395,6 @@ class TestSelectelProvider(TestCase):
     @requests_mock.Mocker()
     def test_list_zones(self, fake_http):
         fake_http.get(f'{self.API_URL}/', json=self.domain)
-        fake_http.head(
-            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
-        )
 
         expected = ['unit.tests.']
         provider = SelectelProvider(123, 'test_token')
@@ -432,9 +405,6 @@ class TestSelectelProvider(TestCase):
     @requests_mock.Mocker()
     def test_authentication_fail(self, fake_http):
         fake_http.get(f'{self.API_URL}/', status_code=401)
-        fake_http.head(
-            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
-        )
 
         with self.assertRaises(Exception) as ctx:
             SelectelProvider(123, 'fail_token')
@@ -445,9 +415,6 @@ class TestSelectelProvider(TestCase):
     @requests_mock.Mocker()
     def test_not_exist_domain(self, fake_http):
         fake_http.get(f'{self.API_URL}/', status_code=404, json='')
-        fake_http.head(
-            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
-        )
 
         fake_http.post(
             f'{self.API_URL}/',
@@ -458,10 +425,6 @@ class TestSelectelProvider(TestCase):
             },
         )
         fake_http.get(f'{self.API_URL}/unit.tests/records/', json=list())
-        fake_http.head(
-            f'{self.API_URL}/unit.tests/records/',
-            headers={'X-Total-Count': str(len(self.api_record))},
-        )
         fake_http.post(f'{self.API_URL}/100000/records/', json=list())
 
         provider = SelectelProvider(123, 'test_token', strict_supports=False)
@@ -479,13 +442,6 @@ class TestSelectelProvider(TestCase):
     def test_delete_no_exist_record(self, fake_http):
         fake_http.get(f'{self.API_URL}/', json=self.domain)
         fake_http.get(f'{self.API_URL}/100000/records/', json=list())
-        fake_http.head(
-            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
-        )
-        fake_http.head(
-            f'{self.API_URL}/unit.tests/records/',
-            headers={'X-Total-Count': '0'},
-        )
 
         provider = SelectelProvider(123, 'test_token')
 
@@ -515,17 +471,6 @@ class TestSelectelProvider(TestCase):
         fake_http.get(f'{self.API_URL}/unit.tests/records/', json=exist_record)
         fake_http.get(f'{self.API_URL}/', json=self.domain)
         fake_http.get(f'{self.API_URL}/100000/records/', json=exist_record)
-        fake_http.head(
-            f'{self.API_URL}/unit.tests/records/',
-            headers={'X-Total-Count': str(len(exist_record))},
-        )
-        fake_http.head(
-            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
-        )
-        fake_http.head(
-            f'{self.API_URL}/100000/records/',
-            headers={'X-Total-Count': str(len(exist_record))},
-        )
         fake_http.post(f'{self.API_URL}/100000/records/', json=list())
         fake_http.delete(f'{self.API_URL}/100000/records/100001', text="")
         fake_http.delete(f'{self.API_URL}/100000/records/100002', text="")
@@ -544,9 +489,6 @@ class TestSelectelProvider(TestCase):
     @requests_mock.Mocker()
     def test_include_change_returns_false(self, fake_http):
         fake_http.get(f'{self.API_URL}/', json=self.domain)
-        fake_http.head(
-            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
-        )
         provider = SelectelProvider(123, 'test_token')
         zone = Zone('unit.tests.', [])
 
@@ -567,14 +509,343 @@ class TestSelectelProvider(TestCase):
         fake_http.get(f'{self.API_URL}/', json=self.domain)
         record = dict(id=1, type="NS", name="unit.tests")
         fake_http.get(f'{self.API_URL}/100000/records/', json=[record])
-        fake_http.head(
-            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
-        )
-        fake_http.head(
-            f'{self.API_URL}/unit.tests/records/',
-            headers={'X-Total-Count': '1'},
-        )
         fake_http.delete(f'{self.API_URL}/100000/records/1', exc=HTTPError)
         provider = SelectelProvider(123, 'test_token')
 
         provider.delete_record('unit.tests', 'NS', None)
+
+    @requests_mock.Mocker()
+    def test_session_options(self, fake_http):
+        fake_http.get(f'{self.API_URL}/', json=self.domain)
+        provider = SelectelProvider(
+            123,
+            'test_token',
+            pool_connections=2,
+            pool_maxsize=20,
+            connect_timeout=1,
+            read_timeout=5,
+            deadline=3600,
+        )
+        adapter = provider._sess.get_adapter(self.API_URL)
+        self.assertEqual(2, adapter._pool_connections)
+        self.assertEqual(20, adapter._pool_maxsize)
+        for request in fake_http.request_history:
+            self.assertEqual((1, 5), request.timeout)
+
+    @requests_mock.Mocker()
+    def test_pool_maxsize_fits_workers(self, fake_http):
+        fake_http.get(f'{self.API_URL}/', json=self.domain)
+        for expected, options in (
+            (10, {}),
+            (10, dict(pagination_workers=4, delete_workers=8)),
+            (16, dict(pagination_workers=16)),
+            (24, dict(pagination_workers=4, delete_workers=24)),
+            (5, dict(delete_workers=24, pool_maxsize=5)),
+        ):
+            provider = SelectelProvider(123, 'test_token', **options)
+            adapter = provider._sess.get_adapter(self.API_URL)
+            self.assertEqual(expected, adapter._pool_maxsize, options)
+
+    def _paged_domains(self, fake_http, count, headers=True):
+        domains = [
+            dict(name=f'{i}.tests', id=i, tags=[], user_id=1)
+            for i in range(count)
+        ]
+        for offset in range(0, count or 1, 2):
+            fake_http.get(
+                f'{self.API_URL}/?limit=2&offset={offset}',
+                json=domains[offset : offset + 2],
+                headers={'X-Total-Count': str(count)} if headers else {},
+            )
+        return {domain['name']: domain for domain in domains}
+
+    @requests_mock.Mocker()
+    def test_domain_list_paginated(self, fake_http):
+        expected = self._paged_domains(fake_http, 5)
+        provider = SelectelProvider(123, 'test_token', pagination_limit=2)
+        self.assertEqual(expected, provider.domain_list())
+        # three pages for each of the two listings, no HEAD requests
+        self.assertEqual(
+            ['GET'] * 6, [r.method for r in fake_http.request_history]
+        )
+
+    @requests_mock.Mocker()
+    def test_domain_list_paginated_concurrently(self, fake_http):
+        expected = self._paged_domains(fake_http, 9)
+        provider = SelectelProvider(
+            123, 'test_token', pagination_limit=2, pagination_workers=4
+        )
+        self.assertEqual(list(expected), list(provider.domain_list()))
+
+    @requests_mock.Mocker()
+    def test_zone_records_paginated_concurrently(self, fake_http):
+        fake_http.get(f'{self.API_URL}/', json=self.domain)
+        records = [
+            dict(id=i, type='A', name='www.unit.tests', content=f'1.1.1.{i}')
+            for i in range(1, 6)
+        ]
+        path = f'{self.API_URL}/unit.tests/records/?limit=2'
+        fake_http.get(
+            f'{path}&offset=0', json=records[:2], headers={'X-Total-Count': '6'}
+        )
+        # a record deleted meanwhile, the second one is on this page too
+        fake_http.get(f'{path}&offset=2', json=records[1:3])
+        fake_http.get(f'{path}&offset=4', json=records[3:])
+        provider = SelectelProvider(
+            123, 'test_token', pagination_limit=2, pagination_workers=2
+        )
+        self.assertEqual(
+            records, provider.zone_records(Zone('unit.tests.', []))
+        )
+
+    @requests_mock.Mocker()
+    def test_domain_list_paginated_without_count(self, fake_http):
+        # ends with a short page
+        expected = self._paged_domains(fake_http, 5, headers=False)
+        provider = SelectelProvider(123, 'test_token', pagination_limit=2)
+        self.assertEqual(expected, provider.domain_list())
+        self.assertEqual(6, fake_http.call_count)
+
+        # ends with an empty page
+        fake_http.reset_mock()
+        expected = self._paged_domains(fake_http, 4, headers=False)
+        fake_http.get(f'{self.API_URL}/?limit=2&offset=4', json=[])
+        self.assertEqual(expected, provider.domain_list())
+        self.assertEqual(3, fake_http.call_count)
+
+    @requests_mock.Mocker()
+    def test_zone_records_not_found(self, fake_http):
+        fake_http.get(f'{self.API_URL}/', json=self.domain)
+        fake_http.get(f'{self.API_URL}/unit.tests/records/', status_code=404)
+        provider = SelectelProvider(123, 'test_token')
+        self.assertEqual([], provider.zone_records(Zone('unit.tests.', [])))
+
+    def _update(self, fake_http, existing, _type, old, new, **delete):
+        fake_http.get(f'{self.API_URL}/', json=self.domain)
+        fake_http.get(f'{self.API_URL}/100000/records/', json=existing)
+        fake_http.post(f'{self.API_URL}/100000/records/', json={})
+        for record in existing:
+            path = f'{self.API_URL}/100000/records/{record["id"]}'
+            fake_http.put(path, json={})
+            fake_http.delete(path, **(delete or dict(text='')))
+        provider = SelectelProvider(123, 'test_token')
+        zone = Zone('unit.tests.', [])
+        change = Update(
+            Record.new(zone, 'www', dict(old, type=_type)),
+            Record.new(zone, 'www', dict(new, type=_type)),
+        )
+        provider._apply_update('unit.tests', change)
+        return [
+            (
+                r.method,
+                r.path.rsplit('/', 2)[-1] or None,
+                r.json() if r.body else None,
+            )
+            for r in fake_http.request_history[2:]
+        ]
+
+    def _api_records(self, _type, ttl, *values):
+        return [
+            dict(value, id=i, name='www.unit.tests', type=_type, ttl=ttl)
+            for i, value in enumerate(values, 1)
+        ]
+
+    @requests_mock.Mocker()
+    def test_update_record_values(self, fake_http):
+        existing = self._api_records(
+            'A', 300, dict(content='1.1.1.1'), dict(content='2.2.2.2')
+        )
+        # another name and type are left alone
+        existing.append(dict(existing[0], id=3, name='unit.tests'))
+        existing.append(dict(existing[0], id=4, type='AAAA', content='::1'))
+        requests = self._update(
+            fake_http,
+            existing,
+            'A',
+            dict(ttl=300, values=['1.1.1.1', '2.2.2.2']),
+            dict(ttl=300, values=['2.2.2.2', '3.3.3.3']),
+        )
+        created = dict(
+            content='3.3.3.3', name='www.unit.tests.', ttl=300, type='A'
+        )
+        # created before the removed value goes
+        self.assertEqual(
+            [('POST', None, created), ('DELETE', '1', None)], requests
+        )
+
+    @requests_mock.Mocker()
+    def test_update_record_ttl(self, fake_http):
+        existing = self._api_records(
+            'MX',
+            300,
+            dict(content='mx1.unit.tests', priority=10, email=None),
+            dict(content='mx2.unit.tests', priority=20, email=None),
+        )
+        requests = self._update(
+            fake_http,
+            existing,
+            'MX',
+            dict(
+                ttl=300,
+                values=[
+                    dict(preference=10, exchange='mx1.unit.tests.'),
+                    dict(preference=20, exchange='mx2.unit.tests.'),
+                ],
+            ),
+            dict(
+                ttl=600,
+                values=[
+                    dict(preference=10, exchange='mx1.unit.tests.'),
+                    dict(preference=30, exchange='mx2.unit.tests.'),
+                ],
+            ),
+        )
+        self.assertEqual(
+            [('POST', None, 30), ('PUT', '1', 10), ('DELETE', '2', None)],
+            [(m, i, d and d['priority']) for m, i, d in requests],
+        )
+        self.assertEqual(600, requests[1][2]['ttl'])
+
+    @requests_mock.Mocker()
+    def test_update_record_follows_index(self, fake_http):
+        existing = self._api_records(
+            'A',
+            300,
+            dict(content='1.1.1.1'),
+            dict(content='2.2.2.2'),
+            dict(content='4.4.4.4'),
+        )
+        fake_http.get(f'{self.API_URL}/', json=self.domain)
+        fake_http.get(f'{self.API_URL}/100000/records/', json=existing)
+        fake_http.post(
+            f'{self.API_URL}/100000/records/',
+            json=dict(existing[0], id=10, content='3.3.3.3', ttl=600),
+        )
+        for record in existing:
+            path = f'{self.API_URL}/100000/records/{record["id"]}'
+            fake_http.put(path, json={})
+            fake_http.delete(path, text='')
+        fake_http.delete(f'{self.API_URL}/100000/records/3', exc=HTTPError)
+        fake_http.delete(f'{self.API_URL}/100000/records/10', text='')
+        provider = SelectelProvider(123, 'test_token')
+        zone = Zone('unit.tests.', [])
+        change = Update(
+            Record.new(
+                zone,
+                'www',
+                dict(type='A', ttl=300, values=['1.1.1.1', '2.2.2.2']),
+            ),
+            Record.new(
+                zone,
+                'www',
+                dict(type='A', ttl=600, values=['2.2.2.2', '3.3.3.3']),
+            ),
+        )
+        with self.assertLogs(provider.log, 'WARNING'):
+            provider._apply_update('unit.tests', change)
+        # deleted one is gone, the one failing to delete is still there
+        self.assertEqual(
+            [(2, 600), (3, 300), (10, 600)],
+            [
+                (record['id'], record['ttl'])
+                for record in provider._zone_index['unit.tests.'][
+                    ('www.unit.tests', 'A')
+                ]
+            ],
+        )
+
+        # later deletes of the name go by it
+        fake_http.reset_mock()
+        with self.assertLogs(provider.log, 'WARNING'):
+            provider.delete_record('unit.tests', 'A', 'www')
+        self.assertEqual(
+            ['2', '3', '10'],
+            [r.path.rsplit('/', 1)[-1] for r in fake_http.request_history],
+        )
+
+    @requests_mock.Mocker()
+    def test_update_record_without_ids(self, fake_http):
+        fake_http.get(f'{self.API_URL}/', json=self.domain)
+        fake_http.get(
+            f'{self.API_URL}/100000/records/',
+            json=self._api_records('A', 300, dict(content='1.1.1.1')),
+        )
+        fake_http.post(f'{self.API_URL}/100000/records/', json={})
+        provider = SelectelProvider(123, 'test_token')
+        zone = Zone('unit.tests.', [])
+        change = Update(
+            Record.new(zone, 'www', dict(type='A', ttl=300, value='1.1.1.1')),
+            Record.new(
+                zone,
+                'www',
+                dict(type='A', ttl=300, values=['1.1.1.1', '2.2.2.2']),
+            ),
+        )
+        provider._apply_update('unit.tests', change)
+        # what was created can't be told apart, the zone is listed again
+        self.assertNotIn('unit.tests.', provider._zone_index)
+        self.assertNotIn('unit.tests.', provider._zone_records)
+
+    @requests_mock.Mocker()
+    def test_update_single_value_record(self, fake_http):
+        existing = self._api_records(
+            'CNAME', 300, dict(content='old.unit.tests')
+        )
+        requests = self._update(
+            fake_http,
+            existing,
+            'CNAME',
+            dict(ttl=300, value='old.unit.tests.'),
+            dict(ttl=300, value='new.unit.tests.'),
+            exc=HTTPError,
+        )
+        # the old one has to go first, failing to delete it isn't fatal
+        self.assertEqual(['DELETE', 'POST'], [r[0] for r in requests])
+
+    @requests_mock.Mocker()
+    def test_delete_record_concurrently(self, fake_http):
+        fake_http.get(f'{self.API_URL}/', json=self.domain)
+        records = [
+            dict(id=i, type='A', name='www.unit.tests', content=f'1.1.1.{i}')
+            for i in range(1, 6)
+        ] + [dict(id=6, type='TXT', name='www.unit.tests', content='v')]
+        fake_http.get(
+            f'{self.API_URL}/100000/records/?limit=2&offset=0',
+            json=records[:2],
+            headers={'X-Total-Count': '6'},
+        )
+        for offset in (2, 4):
+            fake_http.get(
+                f'{self.API_URL}/100000/records/?limit=2&offset={offset}',
+                json=records[offset : offset + 2],
+            )
+        for record in records:
+            fake_http.delete(
+                f'{self.API_URL}/100000/records/{record["id"]}', text=''
+            )
+        fake_http.delete(f'{self.API_URL}/100000/records/3', exc=HTTPError)
+        provider = SelectelProvider(
+            123, 'test_token', pagination_limit=2, delete_workers=4
+        )
+
+        with self.assertLogs(provider.log, 'WARNING') as logs:
+            provider.delete_record('unit.tests', 'A', 'www')
+        self.assertEqual(
+            ['WARNING:SelectelProvider[123]:Failed to delete 1 record(s): 3'],
+            logs.output,
+        )
+        deletes = [r for r in fake_http.request_history if r.method == 'DELETE']
+        self.assertEqual(
+            {'1', '2', '3', '4', '5'},
+            {r.path.rsplit('/', 1)[-1] for r in deletes},
+        )
+        # the zone was loaded once, only what is left is tried again
+        fake_http.reset_mock()
+        provider.delete_record('unit.tests', 'A', 'www')
+        self.assertEqual(
+            [('DELETE', '/domains/v1/100000/records/3')],
+            [(r.method, r.path) for r in fake_http.request_history],
+        )
+        fake_http.reset_mock()
+        provider.delete_record('unit.tests', 'TXT', 'www')
+        self.assertEqual(1, fake_http.call_count)
@@ -1,13 +1,23 @@
 import uuid
+from tempfile import TemporaryDirectory
 from unittest import TestCase
+from unittest.mock import patch
 
 import requests_mock
 
-from octodns.record import Record, Update
+from octodns.provider.plan import Plan
+from octodns.record import Create, Delete, Record, Update
 from octodns.zone import Zone
 
 from octodns_selectel.v2.dns_client import DNSClient
-from octodns_selectel.v2.mappings import to_octodns_record_data
+from octodns_selectel.v2.exceptions import (
+    ApiNotFoundException,
+    SelectelException,
+)
+from octodns_selectel.v2.mappings import (
+    to_octodns_record_data,
+    to_selectel_rrset,
+)
 from octodns_selectel.v2.provider import SelectelProvider
 
 
@@ -415,6 +425,72 @@ class TestSelectelProvider(TestCase):
         apply_len = provider.apply(plan)
 
         self.assertEqual(1, apply_len)
+        # only the ttl is sent
+        self.assertEqual(['ttl'], list(fake_http.last_request.json()))
+
+    @requests_mock.Mocker()
+    def test_apply_update_records_only(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+        rrset = self._a_rrset(str(uuid.uuid4()), 'node')
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset',
+            json=dict(result=[rrset], limit=1, next_offset=0),
+        )
+        fake_http.patch(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset/{rrset["id"]}',
+            status_code=204,
+        )
+
+        zone = Zone(self._zone_name, [])
+        zone.add_record(
+            Record.new(
+                zone,
+                'node',
+                dict(type='A', ttl=self._ttl, values=['1.2.3.4', '9.9.9.9']),
+            )
+        )
+        provider = SelectelProvider(self._version, self._openstack_token)
+        self.assertEqual(1, provider.apply(provider.plan(zone)))
+        self.assertEqual(
+            dict(records=[dict(content='1.2.3.4'), dict(content='9.9.9.9')]),
+            fake_http.last_request.json(),
+        )
+
+    @requests_mock.Mocker()
+    def test_apply_update_skips_no_op(self, fake_http):
+        rrset = dict(self._a_rrset(str(uuid.uuid4()), 'node'), ttl=60)
+        existing = Record.new(
+            self.octodns_zone, 'node', to_octodns_record_data(rrset)
+        )
+        # below MIN_TTL, so the same as on the server once clamped, and
+        # records in a different order
+        new = Record.new(
+            self.octodns_zone,
+            'node',
+            dict(type='A', ttl=30, values=['5.6.7.8', '1.2.3.4']),
+            lenient=True,
+        )
+        provider = SelectelProvider(self._version, self._openstack_token)
+        provider._index_rrset(self._zone_name, rrset)
+        payload = dict(
+            rrset,
+            ttl=30,
+            records=[dict(content='5.6.7.8'), dict(content='1.2.3.4')],
+        )
+
+        with self.assertLogs(provider.log, 'DEBUG') as logs:
+            provider._apply_update(
+                self._zone_id, Update(existing, new), payload
+            )
+        self.assertIn('nothing to change', logs.output[0])
+        self.assertEqual(0, fake_http.call_count)
 
     @requests_mock.Mocker()
     def test_apply_update_ttl_internal_error(self, fake_http):
@@ -503,6 +579,7 @@ class TestSelectelProvider(TestCase):
         apply_len = provider.apply(plan)
 
         self.assertEqual(1, apply_len)
+        self.assertEqual({}, provider._zone_rrsets[self._zone_name])
 
     @requests_mock.Mocker()
     def test_apply_delete_with_error(self, fake_http):
@@ -543,6 +620,12 @@ class TestSelectelProvider(TestCase):
         with self.assertLogs(provider.log, "WARNING"):
             apply_len = provider.apply(plan)
             self.assertEqual(1, apply_len)
+        self.assertEqual(
+            deleted_rrset['id'],
+            provider._get_rrset_id(
+                self._zone_name, deleted_rrset['type'], deleted_rrset['name']
+            ),
+        )
 
     @requests_mock.Mocker()
     def test_include_change_returns_false(self, fake_http):
@@ -663,3 +746,602 @@ class TestSelectelProvider(TestCase):
         zones = provider.list_zones()
 
         self.assertListEqual(zones, self._zone_name.split())
+
+    @requests_mock.Mocker()
+    def test_list_rrsets(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/'
+            f'rrset?limit={DNSClient._PAGINATION_LIMIT}&offset=0',
+            json=dict(
+                result=self.rrsets, limit=len(self.rrsets), next_offset=0
+            ),
+        )
+        provider = SelectelProvider(self._version, self._openstack_token)
+        rrsets = provider.list_rrsets(Zone(self._zone_name, []))
+
+        self.assertEqual(self.rrsets, rrsets)
+        self.assertEqual(
+            {
+                (rrset['name'], rrset['type']): (
+                    rrset['id'],
+                    rrset['ttl'],
+                    tuple(sorted(r['content'] for r in rrset['records'])),
+                )
+                for rrset in self.rrsets
+            },
+            provider._zone_rrsets[self._zone_name],
+        )
+
+    @requests_mock.Mocker()
+    def test_apply_concurrently_deletes_first(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+        a_rrset = self._a_rrset(str(uuid.uuid4()), 'node')
+        sub_rrset = self._a_rrset(str(uuid.uuid4()), 'sub')
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/'
+            f'rrset?limit={DNSClient._PAGINATION_LIMIT}&offset=0',
+            json=dict(result=[a_rrset, sub_rrset], limit=2, next_offset=0),
+        )
+        fake_http.post(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset', json=dict()
+        )
+        fake_http.patch(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset/{sub_rrset["id"]}',
+            status_code=204,
+        )
+        fake_http.delete(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset/{a_rrset["id"]}',
+            status_code=204,
+        )
+
+        zone = Zone(self._zone_name, [])
+        zone.add_record(
+            Record.new(
+                zone,
+                'node',
+                data=dict(ttl=self._ttl, type='CNAME', value='foo.unit.tests.'),
+            )
+        )
+        sub_data = to_octodns_record_data(sub_rrset)
+        sub_data['ttl'] *= 2
+        zone.add_record(Record.new(zone, 'sub', data=sub_data))
+        zone.add_record(
+            Record.new(
+                zone, 'new', data=dict(ttl=self._ttl, type='A', value='1.1.1.1')
+            )
+        )
+
+        provider = SelectelProvider(
+            self._version, self._openstack_token, max_workers=4
+        )
+        plan = provider.plan(zone)
+        self.assertEqual(4, provider.apply(plan))
+
+        methods = [request.method for request in fake_http.request_history]
+        writes = methods[methods.index('DELETE') :]
+        self.assertEqual('DELETE', writes[0])
+        self.assertEqual(['PATCH', 'POST', 'POST'], sorted(writes[1:]))
+
+    @requests_mock.Mocker()
+    def test_apply_concurrently_collects_errors(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/'
+            f'rrset?limit={DNSClient._PAGINATION_LIMIT}&offset=0',
+            json=dict(result=list(), limit=0, next_offset=0),
+        )
+        fake_http.post(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset',
+            status_code=422,
+            json=dict(description='invalid rrset'),
+        )
+
+        zone = Zone(self._zone_name, [])
+        for name in ('a', 'b', 'c'):
+            zone.add_record(
+                Record.new(
+                    zone,
+                    name,
+                    data=dict(ttl=self._ttl, type='A', value='1.1.1.1'),
+                )
+            )
+
+        provider = SelectelProvider(
+            self._version, self._openstack_token, max_workers=2
+        )
+        plan = provider.plan(zone)
+        with self.assertRaises(SelectelException) as ctx:
+            provider.apply(plan)
+
+        message = str(ctx.exception)
+        self.assertTrue(message.startswith('Failed to apply 3 change(s): '))
+        positions = [
+            message.index(f'{name}.{self._zone_name}') for name in 'abc'
+        ]
+        self.assertEqual(sorted(positions), positions)
+
+    @requests_mock.Mocker()
+    def test_apply_create_indexes_rrset(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/'
+            f'rrset?limit={DNSClient._PAGINATION_LIMIT}&offset=0',
+            json=dict(result=list(), limit=0, next_offset=0),
+        )
+        created_rrset = self._a_rrset(str(uuid.uuid4()), 'new')
+        fake_http.post(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset',
+            json=created_rrset,
+        )
+
+        zone = Zone(self._zone_name, [])
+        zone.add_record(
+            Record.new(zone, 'new', data=to_octodns_record_data(created_rrset))
+        )
+        provider = SelectelProvider(self._version, self._openstack_token)
+        plan = provider.plan(zone)
+        self.assertEqual(1, provider.apply(plan))
+
+        self.assertEqual(
+            created_rrset['id'],
+            provider._get_rrset_id(self._zone_name, 'A', created_rrset['name']),
+        )
+
+    @requests_mock.Mocker()
+    def test_zones_are_discovered_lazily(self, fake_http):
+        provider = SelectelProvider(self._version, self._openstack_token)
+        self.assertEqual(0, fake_http.call_count)
+
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones?filter={self._zone_name}',
+            json=dict(result=self.selectel_zones, next_offset=0),
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones?filter=other.tests.',
+            json=dict(result=[], next_offset=0),
+        )
+        for _ in range(2):
+            self.assertTrue(provider._is_zone_already_created(self._zone_name))
+            self.assertFalse(provider._is_zone_already_created('other.tests.'))
+        self.assertEqual(2, fake_http.call_count)
+
+    @requests_mock.Mocker()
+    def test_list_zones_once(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(result=self.selectel_zones, next_offset=0),
+        )
+        provider = SelectelProvider(self._version, self._openstack_token)
+        self.assertEqual([self._zone_name], provider.list_zones())
+        self.assertEqual([self._zone_name], provider.list_zones())
+        # everything is known once the whole list was fetched
+        self.assertFalse(provider._is_zone_already_created('other.tests.'))
+        self.assertEqual(1, fake_http.call_count)
+
+    def _cached_provider(self, directory):
+        return SelectelProvider(
+            self._version,
+            self._openstack_token,
+            zone_cache_dir=directory,
+            zone_cache_ttl=60,
+        )
+
+    @requests_mock.Mocker()
+    def test_zone_cache(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(result=self.selectel_zones, next_offset=0),
+        )
+        with TemporaryDirectory() as directory:
+            provider = self._cached_provider(directory)
+            self.assertEqual([self._zone_name], provider.list_zones())
+            self.assertEqual(1, fake_http.call_count)
+
+            provider = self._cached_provider(directory)
+            self.assertEqual([self._zone_name], provider.list_zones())
+            self.assertEqual(
+                self._zone_id, provider._get_zone_id_by_name(self._zone_name)
+            )
+            self.assertEqual(1, fake_http.call_count)
+
+            # zones missing in the cache are still looked up, and a zone
+            # found this way means the cache is outdated
+            fake_http.get(
+                f'{DNSClient.API_URL}/zones?filter=other.tests.',
+                json=dict(
+                    result=[dict(id='other', name='other.tests.')],
+                    next_offset=0,
+                ),
+            )
+            self.assertTrue(provider._is_zone_already_created('other.tests.'))
+            self.assertEqual(2, fake_http.call_count)
+            self.assertIsNone(provider._zone_cache.load())
+
+    @requests_mock.Mocker()
+    def test_zone_cache_invalidated_on_create_zone(self, fake_http):
+        fake_http.post(
+            f'{DNSClient.API_URL}/zones', json=dict(id='new', name='new.tests.')
+        )
+        with TemporaryDirectory() as directory:
+            provider = self._cached_provider(directory)
+            provider._zone_cache.save(dict())
+            provider.create_zone('new.tests.')
+            self.assertIsNone(provider._zone_cache.load())
+
+    @requests_mock.Mocker()
+    def test_zone_cache_stale_id(self, fake_http):
+        stale_id = str(uuid.uuid4())
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{stale_id}/rrset',
+            status_code=404,
+            json=dict(error='zone_not_found'),
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones?filter={self._zone_name}',
+            json=dict(result=self.selectel_zones, next_offset=0),
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset',
+            json=dict(result=self.rrsets, next_offset=0),
+        )
+        with TemporaryDirectory() as directory:
+            provider = self._cached_provider(directory)
+            provider._zone_cache.save(
+                {self._zone_name: dict(id=stale_id, name=self._zone_name)}
+            )
+            zone = Zone(self._zone_name, [])
+            self.assertTrue(provider.populate(zone))
+            self.assertEqual(self.expected_records, zone.records)
+            self.assertIsNone(provider._zone_cache.load())
+
+    @requests_mock.Mocker()
+    def test_zone_cache_deleted_zone(self, fake_http):
+        stale_id = str(uuid.uuid4())
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{stale_id}/rrset',
+            status_code=404,
+            json=dict(error='zone_not_found'),
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones?filter={self._zone_name}',
+            json=dict(result=[], next_offset=0),
+        )
+        with TemporaryDirectory() as directory:
+            provider = self._cached_provider(directory)
+            provider._zone_cache.save(
+                {self._zone_name: dict(id=stale_id, name=self._zone_name)}
+            )
+            zone = Zone(self._zone_name, [])
+            self.assertFalse(provider.populate(zone))
+            self.assertEqual(0, len(zone.records))
+
+    @requests_mock.Mocker()
+    def test_populate_zone_not_found(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(result=self.selectel_zones, next_offset=0),
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset',
+            status_code=404,
+            json=dict(error='zone_not_found'),
+        )
+        provider = SelectelProvider(self._version, self._openstack_token)
+        with self.assertRaises(ApiNotFoundException):
+            provider.populate(Zone(self._zone_name, []))
+
+    def test_pool_maxsize_fits_workers(self):
+        for kwargs, expected in (
+            (dict(), 10),
+            (dict(max_workers=32), 32),
+            (dict(pagination_workers=16, max_workers=4), 16),
+            (dict(max_workers=32, pool_maxsize=64), 64),
+            (dict(pagination_workers=4, prefetch_workers=8), 10),
+            (
+                dict(
+                    pagination_workers=4,
+                    prefetch_workers=8,
+                    prefetch_zones=True,
+                ),
+                32,
+            ),
+        ):
+            provider = SelectelProvider(
+                self._version, self._openstack_token, **kwargs
+            )
+            adapter = provider._client._sess.get_adapter(DNSClient.API_URL)
+            self.assertEqual(expected, adapter._pool_maxsize)
+
+    @requests_mock.Mocker()
+    def test_rrset_cache_follows_writes(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+        updated = self._a_rrset(str(uuid.uuid4()), 'updated')
+        deleted = self._a_rrset(str(uuid.uuid4()), 'deleted')
+        rrsets_path = f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset'
+        fake_http.get(
+            rrsets_path, json=dict(result=[updated, deleted], next_offset=0)
+        )
+        fake_http.patch(f'{rrsets_path}/{updated["id"]}', status_code=204)
+        fake_http.delete(f'{rrsets_path}/{deleted["id"]}', status_code=204)
+        created_id = str(uuid.uuid4())
+        fake_http.post(rrsets_path, json=dict(id=created_id))
+
+        desired = Zone(self._zone_name, [])
+        desired.add_record(
+            Record.new(
+                desired,
+                'updated',
+                dict(type='A', ttl=self._ttl * 2, value='1.2.3.4'),
+            )
+        )
+        desired.add_record(
+            Record.new(
+                desired, 'created', dict(type='A', ttl=600, value='4.3.2.1')
+            )
+        )
+        provider = SelectelProvider(
+            self._version, self._openstack_token, rrset_cache=True
+        )
+        self.assertEqual(3, provider.apply(provider.plan(desired)))
+        calls = fake_http.call_count
+
+        zone = Zone(self._zone_name, [])
+        self.assertTrue(provider.populate(zone))
+        # served from the copy kept up to date by the writes
+        self.assertEqual(calls, fake_http.call_count)
+        self.assertEqual(
+            {r.name: r.data for r in desired.records},
+            {r.name: r.data for r in zone.records},
+        )
+        self.assertEqual(
+            created_id,
+            provider._get_rrset_id(
+                self._zone_name, 'A', f'created.{self._zone_name}'
+            ),
+        )
+        self.assertFalse(provider.plan(desired))
+
+    @requests_mock.Mocker()
+    def test_rrset_cache_disabled(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset',
+            json=dict(result=[], next_offset=0),
+        )
+        provider = SelectelProvider(self._version, self._openstack_token)
+        provider.populate(Zone(self._zone_name, []))
+        provider.populate(Zone(self._zone_name, []))
+        # zone lookup and two listings
+        self.assertEqual(3, fake_http.call_count)
+
+    @requests_mock.Mocker()
+    def test_create_zone_seeds_rrsets(self, fake_http):
+        fake_http.post(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(id=self._zone_id, name=self._zone_name),
+        )
+        provider = SelectelProvider(
+            self._version, self._openstack_token, rrset_cache=True
+        )
+        provider.create_zone(self._zone_name)
+        self.assertEqual({}, provider._zone_rrsets[self._zone_name])
+        # but it's not a listing, populate still asks the API
+        self.assertNotIn(self._zone_name, provider._listed_zones)
+
+    @requests_mock.Mocker()
+    def test_update_failure_keeps_cache(self, fake_http):
+        rrset = self._a_rrset(str(uuid.uuid4()), 'node')
+        fake_http.patch(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset/{rrset["id"]}',
+            status_code=400,
+        )
+        provider = SelectelProvider(self._version, self._openstack_token)
+        provider._index_rrset(self._zone_name, rrset)
+        existing = Record.new(
+            self.octodns_zone, 'node', to_octodns_record_data(rrset)
+        )
+        new = Record.new(
+            self.octodns_zone,
+            'node',
+            dict(to_octodns_record_data(rrset), ttl=self._ttl * 2),
+        )
+
+        with self.assertLogs(provider.log, 'WARNING'):
+            provider._apply_update(
+                self._zone_id, Update(existing, new), to_selectel_rrset(new)
+            )
+        self.assertEqual(
+            self._ttl,
+            provider._get_cached_rrset(self._zone_name, 'A', rrset['name']).ttl,
+        )
+
+    def _plan_without_populate(self, fake_http, count, changes):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset?limit=1',
+            json=dict(count=count, next_offset=1, result=[]),
+        )
+        desired = Zone(self._zone_name, [])
+        return Plan(self.octodns_zone, desired, changes, True)
+
+    @requests_mock.Mocker()
+    def test_apply_small_plan_looks_up_rrsets(self, fake_http):
+        rrset = self._a_rrset(str(uuid.uuid4()), 'node')
+        other = self._a_rrset(str(uuid.uuid4()), 'sub.node')
+        existing = Record.new(
+            self.octodns_zone, 'node', to_octodns_record_data(rrset)
+        )
+        new = Record.new(
+            self.octodns_zone,
+            'node',
+            dict(to_octodns_record_data(rrset), ttl=self._ttl * 2),
+        )
+        plan = self._plan_without_populate(
+            fake_http, 5000, [Update(existing, new)]
+        )
+        rrsets_path = f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset'
+        fake_http.get(
+            f'{rrsets_path}?search={rrset["name"]}&rrset_types=A',
+            json=dict(count=2, next_offset=0, result=[other, rrset]),
+        )
+        fake_http.patch(f'{rrsets_path}/{rrset["id"]}', status_code=204)
+
+        provider = SelectelProvider(self._version, self._openstack_token)
+        self.assertEqual(1, provider.apply(plan))
+        # zone, count, lookup and the update itself, no listing
+        self.assertEqual(4, fake_http.call_count)
+        self.assertEqual(dict(ttl=self._ttl * 2), fake_http.last_request.json())
+
+    @requests_mock.Mocker()
+    def test_apply_missing_rrsets(self, fake_http):
+        rrset = self._a_rrset(str(uuid.uuid4()), 'gone')
+        other = self._a_rrset(str(uuid.uuid4()), 'sub.gone')
+        existing = Record.new(
+            self.octodns_zone, 'gone', to_octodns_record_data(rrset)
+        )
+        plan = self._plan_without_populate(fake_http, 5000, [Delete(existing)])
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset'
+            f'?search={rrset["name"]}&rrset_types=A',
+            json=dict(count=1, next_offset=0, result=[other]),
+        )
+
+        provider = SelectelProvider(self._version, self._openstack_token)
+        with self.assertLogs(provider.log, 'WARNING') as logs:
+            self.assertEqual(1, provider.apply(plan))
+        self.assertIn(f'rrset {rrset["name"]} A not found', logs.output[0])
+        # zone, count and lookup, nothing to delete
+        self.assertEqual(3, fake_http.call_count)
+
+        new = Record.new(
+            self.octodns_zone,
+            'gone',
+            dict(to_octodns_record_data(rrset), ttl=self._ttl * 2),
+        )
+        with self.assertRaises(SelectelException) as ctx:
+            provider._apply_update(
+                self._zone_id, Update(existing, new), to_selectel_rrset(new)
+            )
+        self.assertEqual(
+            f'rrset {rrset["name"]} A not found', str(ctx.exception)
+        )
+
+    @requests_mock.Mocker()
+    def test_apply_large_plan_lists_zone(self, fake_http):
+        rrset = self._a_rrset(str(uuid.uuid4()), 'node')
+        existing = Record.new(
+            self.octodns_zone, 'node', to_octodns_record_data(rrset)
+        )
+        plan = self._plan_without_populate(fake_http, 1, [Delete(existing)])
+        rrsets_path = f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset'
+        fake_http.get(
+            f'{rrsets_path}?limit={DNSClient._PAGINATION_LIMIT}',
+            json=dict(count=1, next_offset=0, result=[rrset]),
+        )
+        fake_http.delete(f'{rrsets_path}/{rrset["id"]}', status_code=204)
+
+        provider = SelectelProvider(self._version, self._openstack_token)
+        self.assertEqual(1, provider.apply(plan))
+        # zone, count, listing and the delete
+        self.assertEqual(4, fake_http.call_count)
+        self.assertIn(self._zone_name, provider._listed_zones)
+
+    @requests_mock.Mocker()
+    def test_apply_creates_only_needs_no_ids(self, fake_http):
+        created = self._a_rrset(str(uuid.uuid4()), 'node')
+        new = Record.new(
+            self.octodns_zone, 'node', to_octodns_record_data(created)
+        )
+        plan = self._plan_without_populate(fake_http, 5000, [Create(new)])
+        fake_http.post(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset', json=created
+        )
+
+        provider = SelectelProvider(self._version, self._openstack_token)
+        self.assertEqual(1, provider.apply(plan))
+        # zone and the create
+        self.assertEqual(2, fake_http.call_count)
+
+    @requests_mock.Mocker()
+    @patch('octodns_selectel.v2.provider.AsyncDNSClientRunner')
+    def test_new_zone_created_without_ids(self, fake_http, fake_runner):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(result=[], limit=0, next_offset=0),
+        )
+        fake_http.post(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(id=self._zone_id, name=self._zone_name),
+        )
+        fake_runner.return_value.run.return_value = [dict()]
+        zone = Zone(self._zone_name, [])
+        zone.add_record(
+            Record.new(zone, 'new', dict(type='A', ttl=600, value='1.2.3.4'))
+        )
+        provider = SelectelProvider(
+            self._version,
+            self._openstack_token,
+            new_zone_concurrency=8,
+            connect_timeout=2,
+            read_timeout=20,
+            deadline=600,
+        )
+        self.assertEqual(1, provider.apply(provider.plan(zone)))
+        kwargs = fake_runner.call_args.kwargs
+        self.assertEqual(8, kwargs['max_concurrency'])
+        self.assertEqual(2, kwargs['connect_timeout'])
+        self.assertEqual(20, kwargs['read_timeout'])
+        # the deadline of the whole run, not one of its own
+        self.assertIs(provider._client._deadline, kwargs['deadline'])
+        self.assertEqual(600, kwargs['deadline'].seconds)
+        self.assertEqual({}, provider._zone_rrsets[self._zone_name])
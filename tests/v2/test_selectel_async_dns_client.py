@@ -0,0 +1,318 @@
+import importlib
+import sys
+from asyncio import run
+from unittest import TestCase
+from unittest.mock import patch
+
+import httpx
+
+from octodns_selectel.session import DeadlineExceeded
+from octodns_selectel.v2 import async_dns_client, rate_limiter
+from octodns_selectel.v2.async_dns_client import (
+    AsyncDNSClient,
+    AsyncDNSClientRunner,
+)
+from octodns_selectel.v2.exceptions import ApiException, SelectelException
+
+
+class FakeApi:
+    def __init__(self):
+        self.requests = []
+        self.routes = {}
+
+    def add(self, method, path, *responses):
+        self.routes[(method, path)] = list(responses)
+
+    def __call__(self, request):
+        self.requests.append(request)
+        offset = request.url.params.get('offset')
+        path = request.url.path.replace('/domains/v2', '', 1)
+        key = (request.method, f'{path}?offset={offset}')
+        if key not in self.routes:
+            key = (request.method, path)
+        responses = self.routes[key]
+        response = responses.pop(0) if len(responses) > 1 else responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class TestSelectelAsyncDNSClient(TestCase):
+    zone_id = "01073035-cc25-4956-b0c9-b3a270091c37"
+    rrset_id = "03073035-dd25-4956-b0c9-k91270091d95"
+    library_version = "0.0.1"
+    openstack_token = "some-openstack-token"
+
+    def setUp(self):
+        self.api = FakeApi()
+        patcher = patch('octodns_selectel.v2.async_dns_client.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        async def _sleep(delay):
+            pass
+
+        self.sleep.side_effect = _sleep
+
+    def _client(self, **kwargs):
+        return AsyncDNSClient(
+            self.library_version,
+            self.openstack_token,
+            transport=httpx.MockTransport(self.api),
+            **kwargs,
+        )
+
+    def _call(self, method, *args, **kwargs):
+        async def _run():
+            async with self._client(**kwargs) as client:
+                return await getattr(client, method)(*args)
+
+        return run(_run())
+
+    def _page(self, ids, count, next_offset):
+        return httpx.Response(
+            200,
+            json=dict(
+                count=count,
+                next_offset=next_offset,
+                result=[dict(id=id) for id in ids],
+            ),
+        )
+
+    def test_list_zones_all_pages_at_once(self):
+        self.api.add('GET', '/zones?offset=0', self._page('ab', 7, 2))
+        self.api.add('GET', '/zones?offset=2', self._page('cd', 7, 4))
+        self.api.add('GET', '/zones?offset=4', self._page('de', 8, 6))
+        self.api.add('GET', '/zones?offset=6', self._page('fg', 8, 8))
+        self.api.add('GET', '/zones?offset=8', self._page('h', 8, 0))
+
+        zones = self._call('list_zones', max_concurrency=2)
+
+        self.assertEqual(list('abcdefgh'), [zone['id'] for zone in zones])
+        self.assertEqual(5, len(self.api.requests))
+        request = self.api.requests[0]
+        self.assertEqual(self.openstack_token, request.headers['X-Auth-Token'])
+        self.assertEqual('1000', request.url.params['limit'])
+
+    def test_list_rrsets_single_page(self):
+        path = f'/zones/{self.zone_id}/rrset'
+        self.api.add('GET', path, self._page('ab', 2, 0))
+        rrsets = self._call('list_rrsets', self.zone_id)
+        self.assertEqual(['a', 'b'], [rrset['id'] for rrset in rrsets])
+
+    def test_writes(self):
+        self.api.add(
+            'POST', '/zones', httpx.Response(201, json=dict(id=self.zone_id))
+        )
+        path = f'/zones/{self.zone_id}/rrset'
+        self.api.add(
+            'POST', path, httpx.Response(201, json=dict(id=self.rrset_id))
+        )
+        self.api.add('PATCH', f'{path}/{self.rrset_id}', httpx.Response(204))
+        self.api.add('DELETE', f'{path}/{self.rrset_id}', httpx.Response(204))
+
+        self.assertEqual(
+            dict(id=self.zone_id), self._call('create_zone', 'unit.tests.')
+        )
+        self.assertEqual(
+            dict(id=self.rrset_id),
+            self._call('create_rrset', self.zone_id, dict(ttl=60)),
+        )
+        self.assertEqual(
+            {}, self._call('update_rrset', self.zone_id, self.rrset_id, {})
+        )
+        self.assertEqual(
+            {}, self._call('delete_rrset', self.zone_id, self.rrset_id)
+        )
+        self.assertEqual(
+            b'{"ttl":60}', self.api.requests[1].content.replace(b' ', b'')
+        )
+
+    def test_errors(self):
+        self.api.add(
+            'POST',
+            '/zones',
+            httpx.Response(422, json=dict(description='name is invalid')),
+        )
+        with self.assertRaises(ApiException) as ctx:
+            self._call('create_zone', 'unit.tests.')
+        self.assertEqual(
+            'Bad request. Description: name is invalid.', str(ctx.exception)
+        )
+
+        self.api.add('GET', '/zones', httpx.Response(500, text='<html>'))
+        with self.assertRaises(ApiException) as ctx:
+            self._call('list_zones')
+        self.assertEqual('Internal server error.', str(ctx.exception))
+
+    def test_retries(self):
+        self.api.add(
+            'GET',
+            '/zones',
+            httpx.Response(503),
+            httpx.ConnectError('refused'),
+            httpx.Response(429, headers={'Retry-After': '7'}),
+            self._page('a', 1, 0),
+        )
+        zones = self._call('list_zones')
+        self.assertEqual(['a'], [zone['id'] for zone in zones])
+        self.assertEqual(3, self.sleep.call_count)
+        self.sleep.assert_called_with(7.0)
+
+        self.api.add('POST', '/zones', httpx.ConnectError('refused'))
+        with self.assertRaises(httpx.ConnectError):
+            self._call('create_zone', 'unit.tests.')
+
+        self.api.add('GET', '/zones', httpx.ConnectError('refused'))
+        with self.assertRaises(httpx.ConnectError):
+            self._call('list_zones', retries=1)
+
+        self.api.add('PATCH', '/zones/1/rrset/2', httpx.Response(503))
+        with self.assertRaises(ApiException):
+            self._call('update_rrset', '1', '2', {})
+
+        self.sleep.reset_mock()
+        self.api.add(
+            'GET', '/zones', httpx.Response(429, headers={'Retry-After': '600'})
+        )
+        with self.assertRaises(ApiException):
+            self._call('list_zones')
+        self.sleep.assert_not_called()
+
+    def test_timeouts(self):
+        self.api.add(
+            'GET', '/zones', httpx.ReadTimeout('slow'), self._page('a', 1, 0)
+        )
+        self._call('list_zones', connect_timeout=2, read_timeout=20)
+        self.assertEqual(2, len(self.api.requests))
+        for request in self.api.requests:
+            self.assertEqual(
+                dict(connect=2, read=20, write=20, pool=20),
+                request.extensions['timeout'],
+            )
+
+    @patch('octodns_selectel.session.monotonic')
+    def test_deadline(self, fake_monotonic):
+        self.api.add('GET', '/zones', self._page('a', 1, 0))
+
+        async def _run():
+            async with self._client(deadline=30) as client:
+                fake_monotonic.return_value = 0
+                await client.list_zones()
+                fake_monotonic.return_value = 25
+                await client.list_zones()
+                self.assertEqual(
+                    dict(connect=5, read=5, write=5, pool=5),
+                    self.api.requests[-1].extensions['timeout'],
+                )
+                fake_monotonic.return_value = 30
+                with self.assertRaises(DeadlineExceeded):
+                    await client.list_zones()
+
+        run(_run())
+        self.assertEqual(2, len(self.api.requests))
+
+    @patch('octodns_selectel.session.monotonic', return_value=0)
+    def test_waits_past_deadline(self, fake_monotonic):
+        self.addCleanup(rate_limiter._buckets.clear)
+        self.api.add(
+            'GET', '/zones', httpx.Response(429, headers={'Retry-After': '200'})
+        )
+        with self.assertRaises(DeadlineExceeded):
+            self._call('list_zones', deadline=5)
+        self.api.add('GET', '/zones', self._page('a', 1, 0))
+        with patch(
+            'octodns_selectel.v2.rate_limiter.monotonic', return_value=0
+        ):
+            self._call(
+                'list_zones', rate_limit=0.1, rate_limit_burst=1, deadline=5
+            )
+            with self.assertRaises(DeadlineExceeded):
+                self._call(
+                    'list_zones', rate_limit=0.1, rate_limit_burst=1, deadline=5
+                )
+        self.sleep.assert_not_called()
+        self.assertEqual(2, len(self.api.requests))
+
+    def test_observers(self):
+        events = []
+        self.api.add(
+            'GET',
+            '/zones',
+            httpx.ConnectError('refused'),
+            httpx.Response(503),
+            self._page('a', 1, 0),
+        )
+        self._call('list_zones', observers=[events.append])
+        self.api.add('POST', '/zones', httpx.Response(201, json=dict(id='a')))
+        self._call('create_zone', 'unit.tests.', observers=[events.append])
+        self.assertEqual(
+            [
+                ('GET', '/zones', None, 0, 0, 0),
+                ('GET', '/zones', 503, 0, 0, 1),
+                ('GET', '/zones', 200, 0, 49, 2),
+                ('POST', '/zones', 201, 22, 10, 0),
+            ],
+            [
+                (
+                    e.method,
+                    e.path,
+                    e.status,
+                    e.request_bytes,
+                    e.response_bytes,
+                    e.attempt,
+                )
+                for e in events
+            ],
+        )
+
+    def test_rate_limit(self):
+        self.addCleanup(rate_limiter._buckets.clear)
+        self.api.add('GET', '/zones', self._page('a', 1, 0))
+        with patch(
+            'octodns_selectel.v2.rate_limiter.monotonic', return_value=0
+        ):
+            self._call('list_zones', rate_limit=1)
+            self.sleep.assert_not_called()
+            self._call('list_zones', rate_limit=1)
+            self.sleep.assert_called_once_with(1)
+
+    def test_runner(self):
+        path = f'/zones/{self.zone_id}/rrset'
+        self.api.add(
+            'POST',
+            path,
+            httpx.Response(201, json=dict(id='a')),
+            httpx.Response(409, json=dict(error='rrset_already_exists')),
+            httpx.Response(201, json=dict(id='c')),
+        )
+        runner = AsyncDNSClientRunner(
+            self.library_version,
+            self.openstack_token,
+            transport=httpx.MockTransport(self.api),
+        )
+        results = runner.run(
+            [('create_rrset', self.zone_id, dict(name=n)) for n in 'abc']
+        )
+        self.assertEqual(dict(id='a'), results[0])
+        self.assertIsInstance(results[1], ApiException)
+        self.assertEqual(dict(id='c'), results[2])
+        # client is reusable for the next batch
+        self.assertEqual(
+            [dict(id='c')], runner.run([('create_rrset', self.zone_id, {})])
+        )
+
+    def test_requires_httpx(self):
+        try:
+            with patch.dict(sys.modules, {'httpx': None}):
+                module = importlib.reload(async_dns_client)
+                with self.assertRaises(SelectelException) as ctx:
+                    module.AsyncDNSClient(
+                        self.library_version, self.openstack_token
+                    )
+            self.assertEqual(
+                'AsyncDNSClient requires httpx, install octodns-selectel[async]',
+                str(ctx.exception),
+            )
+        finally:
+            importlib.reload(async_dns_client)
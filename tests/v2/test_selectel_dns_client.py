@@ -1,7 +1,12 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
 from unittest import TestCase
+from unittest.mock import patch
 
 import requests_mock
+from requests.exceptions import ConnectionError, ReadTimeout
 
+from octodns_selectel.session import DeadlineExceeded
 from octodns_selectel.v2.dns_client import DNSClient
 from octodns_selectel.v2.exceptions import ApiException
 
@@ -177,6 +182,110 @@ class TestSelectelDNSClient(TestCase):
         result_list.extend(self._rrsets)
         self.assertEqual(result_list, all_entities)
 
+    def _page(self, ids, count, next_offset):
+        return dict(
+            count=count,
+            next_offset=next_offset,
+            result=[dict(id=id, name=f'{id}.{self.zone_name}') for id in ids],
+        )
+
+    @requests_mock.Mocker()
+    def test_request_all_entities_parallel(self, fake_http):
+        dns_client = DNSClient(
+            self.library_version, self.openstack_token, pagination_workers=4
+        )
+        path = f'{DNSClient.API_URL}/zones/{self.zone_id}/rrset'
+        fake_http.get(
+            f'{path}?offset=0', json=self._page(['a', 'b'], 7, next_offset=2)
+        )
+        fake_http.get(
+            f'{path}?offset=2', json=self._page(['c', 'd'], 7, next_offset=4)
+        )
+        # "d" was shifted onto the next page by a concurrent deletion
+        fake_http.get(
+            f'{path}?offset=4', json=self._page(['d', 'e'], 7, next_offset=6)
+        )
+        fake_http.get(
+            f'{path}?offset=6', json=self._page(['f'], 7, next_offset=0)
+        )
+        all_entities = dns_client._request_all_entities(
+            DNSClient._rrset_path(self.zone_id)
+        )
+        self.assertEqual(
+            ['a', 'b', 'c', 'd', 'e', 'f'], [e['id'] for e in all_entities]
+        )
+        self.assertEqual(4, fake_http.call_count)
+
+    @requests_mock.Mocker()
+    def test_request_all_entities_parallel_single_page(self, fake_http):
+        dns_client = DNSClient(
+            self.library_version, self.openstack_token, pagination_workers=4
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=self._page(['a', 'b'], 2, next_offset=0),
+        )
+        zones = dns_client.list_zones()
+        self.assertEqual(['a', 'b'], [e['id'] for e in zones])
+        self.assertEqual(1, fake_http.call_count)
+
+    @requests_mock.Mocker()
+    def test_request_all_entities_parallel_grown_while_listing(self, fake_http):
+        dns_client = DNSClient(
+            self.library_version, self.openstack_token, pagination_workers=4
+        )
+        path = f'{DNSClient.API_URL}/zones/{self.zone_id}/rrset'
+        fake_http.get(
+            f'{path}?offset=0', json=self._page(['a', 'b'], 4, next_offset=2)
+        )
+        # Entities were added after the first page was served, so the last
+        # known page is not the last one anymore.
+        fake_http.get(
+            f'{path}?offset=2', json=self._page(['c', 'd'], 5, next_offset=4)
+        )
+        fake_http.get(
+            f'{path}?offset=4', json=self._page(['e'], 5, next_offset=0)
+        )
+        all_entities = dns_client.list_rrsets(self.zone_id)
+        self.assertEqual(
+            ['a', 'b', 'c', 'd', 'e'], [e['id'] for e in all_entities]
+        )
+
+    @requests_mock.Mocker()
+    def test_request_all_entities_parallel_many_pages(self, fake_http):
+        dns_client = DNSClient(
+            self.library_version, self.openstack_token, pagination_workers=2
+        )
+        path = f'{DNSClient.API_URL}/zones'
+        for offset in range(0, 10):
+            fake_http.get(
+                f'{path}?offset={offset}',
+                json=self._page(
+                    [str(offset)], 10, next_offset=(offset + 1) % 10
+                ),
+            )
+        zones = dns_client.list_zones()
+        self.assertEqual(
+            [str(offset) for offset in range(0, 10)], [e['id'] for e in zones]
+        )
+
+    @requests_mock.Mocker()
+    def test_iter_rrsets_requests_pages_lazily(self, fake_http):
+        path = f'{DNSClient.API_URL}/zones/{self.zone_id}/rrset'
+        fake_http.get(
+            f'{path}?offset=0', json=self._page(['a', 'b'], 3, next_offset=2)
+        )
+        fake_http.get(
+            f'{path}?offset=2', json=self._page(['c'], 3, next_offset=0)
+        )
+        rrsets = self.dns_client.iter_rrsets(self.zone_id)
+        self.assertEqual(0, fake_http.call_count)
+        self.assertEqual('a', next(rrsets)['id'])
+        self.assertEqual('b', next(rrsets)['id'])
+        self.assertEqual(1, fake_http.call_count)
+        self.assertEqual(['c'], [e['id'] for e in rrsets])
+        self.assertEqual(2, fake_http.call_count)
+
     @requests_mock.Mocker()
     def test_list_zone_success(self, fake_http):
         response_without_offset = dict(
@@ -276,3 +385,316 @@ class TestSelectelDNSClient(TestCase):
             self.zone_id, self.rrset_id
         )
         self.assertEqual(dict(), response_from_delete)
+
+    @requests_mock.Mocker()
+    @patch('octodns_selectel.v2.dns_client.sleep')
+    def test_request_retries_unavailable(self, fake_http, fake_sleep):
+        dns_client = DNSClient(self.library_version, self.openstack_token)
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            [
+                dict(status_code=503),
+                dict(status_code=502),
+                dict(json=self._page(['a'], 1, next_offset=0)),
+            ],
+        )
+        zones = dns_client.list_zones()
+        self.assertEqual(['a'], [zone['id'] for zone in zones])
+        self.assertEqual(3, fake_http.call_count)
+        self.assertEqual(2, dns_client.retry_count)
+        self.assertEqual(2, fake_sleep.call_count)
+
+    @requests_mock.Mocker()
+    @patch('octodns_selectel.v2.dns_client.sleep')
+    def test_request_no_retries_for_unavailable_writes(
+        self, fake_http, fake_sleep
+    ):
+        dns_client = DNSClient(self.library_version, self.openstack_token)
+        fake_http.post(f'{DNSClient.API_URL}/zones', status_code=503)
+        with self.assertRaises(ApiException) as api_exception:
+            dns_client.create_zone(self.zone_name)
+        self.assertEqual('Internal server error.', str(api_exception.exception))
+        self.assertEqual(1, fake_http.call_count)
+        self.assertEqual(0, dns_client.retry_count)
+        fake_sleep.assert_not_called()
+
+    @requests_mock.Mocker()
+    @patch('octodns_selectel.v2.dns_client.sleep')
+    def test_request_retries_throttled_writes_after(
+        self, fake_http, fake_sleep
+    ):
+        dns_client = DNSClient(self.library_version, self.openstack_token)
+        fake_http.post(
+            f'{DNSClient.API_URL}/zones',
+            [
+                dict(status_code=429, headers={'Retry-After': '2'}),
+                dict(json=dict(id=self.zone_id)),
+            ],
+        )
+        zone = dns_client.create_zone(self.zone_name)
+        self.assertEqual(self.zone_id, zone['id'])
+        fake_sleep.assert_called_once_with(2.0)
+
+    @requests_mock.Mocker()
+    @patch('octodns_selectel.v2.dns_client.sleep')
+    def test_request_retry_after_too_long(self, fake_http, fake_sleep):
+        dns_client = DNSClient(
+            self.library_version, self.openstack_token, retry_after_max=60
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            status_code=429,
+            headers={'Retry-After': '3600'},
+        )
+        with self.assertRaises(ApiException) as api_exception:
+            dns_client.list_zones()
+        self.assertEqual('Too many requests.', str(api_exception.exception))
+        self.assertEqual(1, fake_http.call_count)
+        self.assertEqual(0, dns_client.retry_count)
+        fake_sleep.assert_not_called()
+
+    @requests_mock.Mocker()
+    @patch('octodns_selectel.session.monotonic', return_value=0)
+    @patch('octodns_selectel.v2.dns_client.sleep')
+    def test_request_retry_after_past_deadline(
+        self, fake_http, fake_sleep, fake_monotonic
+    ):
+        dns_client = DNSClient(
+            self.library_version, self.openstack_token, deadline=5
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            status_code=429,
+            headers={'Retry-After': '200'},
+        )
+        with self.assertRaises(DeadlineExceeded):
+            dns_client.list_zones()
+        self.assertEqual(1, fake_http.call_count)
+        self.assertEqual(0, dns_client.retry_count)
+        fake_sleep.assert_not_called()
+
+    @requests_mock.Mocker()
+    @patch('octodns_selectel.v2.dns_client.sleep')
+    def test_request_retries_exhausted(self, fake_http, fake_sleep):
+        dns_client = DNSClient(
+            self.library_version, self.openstack_token, retries=2
+        )
+        fake_http.get(f'{DNSClient.API_URL}/zones', status_code=429)
+        with self.assertRaises(ApiException) as api_exception:
+            dns_client.list_zones()
+        self.assertEqual('Too many requests.', str(api_exception.exception))
+        self.assertEqual(3, fake_http.call_count)
+        self.assertEqual(2, dns_client.retry_count)
+
+    @requests_mock.Mocker()
+    @patch('octodns_selectel.v2.dns_client.sleep')
+    def test_request_retries_connection_errors(self, fake_http, fake_sleep):
+        dns_client = DNSClient(
+            self.library_version, self.openstack_token, retries=1
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            [
+                dict(exc=ConnectionError),
+                dict(json=self._page(['a'], 1, next_offset=0)),
+            ],
+        )
+        self.assertEqual(1, len(dns_client.list_zones()))
+        self.assertEqual(1, dns_client.retry_count)
+
+        fake_http.get(f'{DNSClient.API_URL}/zones', exc=ConnectionError)
+        with self.assertRaises(ConnectionError):
+            dns_client.list_zones()
+        self.assertEqual(2, dns_client.retry_count)
+
+        fake_http.post(f'{DNSClient.API_URL}/zones', exc=ConnectionError)
+        with self.assertRaises(ConnectionError):
+            dns_client.create_zone(self.zone_name)
+        self.assertEqual(2, dns_client.retry_count)
+
+    @requests_mock.Mocker()
+    @patch('octodns_selectel.v2.dns_client.sleep')
+    def test_request_observers(self, fake_http, fake_sleep):
+        events = []
+        dns_client = DNSClient(
+            self.library_version,
+            self.openstack_token,
+            observers=[events.append],
+        )
+        fake_http.post(
+            f'{DNSClient.API_URL}/zones/{self.zone_id}/rrset',
+            [
+                dict(exc=ConnectionError),
+                dict(status_code=429),
+                dict(status_code=201, json=dict(id=self.rrset_id)),
+            ],
+        )
+        # connection errors aren't retried for writes
+        with self.assertRaises(ConnectionError):
+            dns_client.create_rrset(self.zone_id, dict(name='a'))
+        dns_client.create_rrset(self.zone_id, dict(name='a'))
+        self.assertEqual(
+            [
+                ('POST', '/zones/{id}/rrset', None, 0, 0, 0),
+                ('POST', '/zones/{id}/rrset', 429, 13, 0, 0),
+                ('POST', '/zones/{id}/rrset', 201, 13, 46, 1),
+            ],
+            [
+                (
+                    e.method,
+                    e.path,
+                    e.status,
+                    e.request_bytes,
+                    e.response_bytes,
+                    e.attempt,
+                )
+                for e in events
+            ],
+        )
+        self.assertTrue(all(e.latency >= 0 for e in events))
+
+        events.clear()
+        dns_client.remove_observer(events.append)
+        dns_client.create_rrset(self.zone_id, dict(name='a'))
+        self.assertEqual([], events)
+        dns_client.add_observer(events.append)
+        dns_client.create_rrset(self.zone_id, dict(name='a'))
+        self.assertEqual(1, len(events))
+
+    def test_retry_delay(self):
+        dns_client = DNSClient(
+            self.library_version,
+            self.openstack_token,
+            retry_backoff=1,
+            retry_backoff_max=10,
+        )
+        with patch('octodns_selectel.v2.dns_client.uniform') as fake_uniform:
+            fake_uniform.side_effect = lambda low, high: high
+            self.assertEqual(1, dns_client._retry_delay(0))
+            self.assertEqual(4, dns_client._retry_delay(2))
+            self.assertEqual(10, dns_client._retry_delay(10))
+            # unparsable Retry-After falls back to the backoff
+            self.assertEqual(2, dns_client._retry_delay(1, 'soon'))
+        self.assertEqual(3, dns_client._retry_delay(0, '3'))
+        # Retry-After isn't capped by retry_backoff_max
+        self.assertEqual(60, dns_client._retry_delay(0, '60'))
+        # too long to wait for
+        self.assertIsNone(dns_client._retry_delay(0, '600'))
+        self.assertEqual(0, dns_client._retry_delay(0, '-1'))
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=5)
+        delay = dns_client._retry_delay(0, format_datetime(retry_at))
+        self.assertTrue(3 < delay <= 5)
+
+    @requests_mock.Mocker()
+    def test_get_zone_by_name(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones?filter={self.zone_name}',
+            json=dict(
+                count=2,
+                next_offset=0,
+                result=[
+                    dict(id='sub', name=f'sub.{self.zone_name}'),
+                    dict(id=self.zone_id, name=self.zone_name),
+                ],
+            ),
+        )
+        zone = self.dns_client.get_zone_by_name(self.zone_name)
+        self.assertEqual(self.zone_id, zone['id'])
+
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones?filter=other.ru.',
+            json=dict(count=0, next_offset=0, result=[]),
+        )
+        self.assertIsNone(self.dns_client.get_zone_by_name('other.ru.'))
+
+    @requests_mock.Mocker()
+    def test_find_rrsets(self, fake_http):
+        name = f'www.{self.zone_name}'
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self.zone_id}/rrset'
+            f'?search={name}&rrset_types=A',
+            json=dict(
+                count=2,
+                next_offset=0,
+                result=[
+                    dict(id='sub', name=f'sub.{name}', type='A'),
+                    dict(id='www', name=name, type='A'),
+                ],
+            ),
+        )
+        self.assertEqual(
+            ['www'],
+            [
+                r['id']
+                for r in self.dns_client.find_rrsets(self.zone_id, name, 'A')
+            ],
+        )
+
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self.zone_id}/rrset?search={name}',
+            json=dict(
+                count=2,
+                next_offset=0,
+                result=[
+                    dict(id='a', name=name, type='A'),
+                    dict(id='txt', name=name, type='TXT'),
+                ],
+            ),
+        )
+        self.assertEqual(
+            ['a', 'txt'],
+            [r['id'] for r in self.dns_client.find_rrsets(self.zone_id, name)],
+        )
+        self.assertNotIn('rrset_types', fake_http.last_request.qs)
+
+    @requests_mock.Mocker()
+    def test_count_rrsets(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self.zone_id}/rrset?limit=1&offset=0',
+            json=dict(count=4242, next_offset=1, result=self._rrsets[:1]),
+        )
+        self.assertEqual(4242, self.dns_client.count_rrsets(self.zone_id))
+
+    @requests_mock.Mocker()
+    @patch('octodns_selectel.v2.dns_client.sleep')
+    def test_request_timeouts(self, fake_http, fake_sleep):
+        dns_client = DNSClient(
+            self.library_version,
+            self.openstack_token,
+            connect_timeout=2,
+            read_timeout=20,
+            pool_maxsize=50,
+        )
+        self.assertEqual(
+            50, dns_client._sess.get_adapter(DNSClient.API_URL)._pool_maxsize
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            [
+                dict(exc=ReadTimeout),
+                dict(json=self._page(['a'], 1, next_offset=0)),
+            ],
+        )
+        self.assertEqual(1, len(dns_client.list_zones()))
+        self.assertEqual(1, dns_client.retry_count)
+        self.assertEqual((2, 20), fake_http.last_request.timeout)
+
+    @requests_mock.Mocker()
+    @patch('octodns_selectel.session.monotonic')
+    def test_request_deadline(self, fake_http, fake_monotonic):
+        dns_client = DNSClient(
+            self.library_version, self.openstack_token, deadline=30
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=self._page(['a'], 1, next_offset=0),
+        )
+        fake_monotonic.return_value = 0
+        dns_client.list_zones()
+        fake_monotonic.return_value = 25
+        dns_client.list_zones()
+        self.assertEqual((5, 5), fake_http.last_request.timeout)
+        fake_monotonic.return_value = 30
+        with self.assertRaises(DeadlineExceeded):
+            dns_client.list_zones()
+        self.assertEqual(2, fake_http.call_count)
@@ -0,0 +1,452 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from glob import glob
+from json import load
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+import pytest
+
+from octodns.provider.plan import Plan
+from octodns.record import Delete, Record
+from octodns.zone import Zone
+
+from octodns_selectel.v2.async_dns_client import AsyncDNSClientRunner
+from octodns_selectel.v2.exceptions import SelectelException
+from octodns_selectel.v2.provider import SelectelProvider
+from tests.fake_api_server import FakeSelectelApi
+
+
+# End-to-end over the loopback interface against the fake API
+@pytest.mark.usefixtures('enable_network')
+class TestSelectelFakeApi(TestCase):
+    _zone_name = 'unit.tests.'
+
+    def setUp(self):
+        self.api = FakeSelectelApi().start()
+        self.addCleanup(self.api.stop)
+        zone_id = self.api.add_zone(self._zone_name)['id']
+        for i in range(5):
+            self.api.add_rrset(
+                zone_id,
+                f'host-{i}.{self._zone_name}',
+                'A',
+                3600,
+                [f'1.1.1.{i}'],
+            )
+        self.zone_id = zone_id
+
+    def _provider(self, **kwargs):
+        provider = SelectelProvider('test', 'token', retry_backoff=0, **kwargs)
+        provider._client.API_URL = self.api.url
+        return provider
+
+    def test_populate_paginated(self):
+        self.api.PAGINATION_MAX = 2
+        zone = Zone(self._zone_name, [])
+        self.assertTrue(self._provider(pagination_workers=2).populate(zone))
+        self.assertEqual(
+            {f'host-{i}' for i in range(5)}, {r.name for r in zone.records}
+        )
+        # zone lookup and 3 pages
+        self.assertEqual(1, self.api.requests[('GET', '/zones')])
+        self.assertEqual(3, self.api.requests[('GET', '/zones/{id}/rrset')])
+
+    def test_retries_injected_failures(self):
+        self.api.fail_next(429, times=2, retry_after=0)
+        self.api.fail_next(503)
+        provider = self._provider()
+        zone = Zone(self._zone_name, [])
+        provider.populate(zone)
+        self.assertEqual(5, len(zone.records))
+        self.assertEqual(3, provider._client.retry_count)
+
+    def test_apply(self):
+        provider = self._provider(max_workers=2)
+        desired = Zone(self._zone_name, [])
+        for i in range(1, 6):
+            desired.add_record(
+                Record.new(
+                    desired,
+                    f'host-{i}',
+                    dict(
+                        type='A',
+                        ttl=7200 if i == 2 else 3600,
+                        value=f'1.1.1.{i}',
+                    ),
+                )
+            )
+        plan = provider.plan(desired)
+        self.assertEqual(3, len(plan.changes))
+        provider.apply(plan)
+        rrsets = {r['name']: r for r in self.api.rrsets[self.zone_id].values()}
+        self.assertNotIn(f'host-0.{self._zone_name}', rrsets)
+        self.assertEqual(7200, rrsets[f'host-2.{self._zone_name}']['ttl'])
+        self.assertEqual(
+            [dict(content='1.1.1.5')],
+            rrsets[f'host-5.{self._zone_name}']['records'],
+        )
+
+    def _new_zone_plan(self, provider, count):
+        desired = Zone('new.tests.', [])
+        for i in range(count):
+            desired.add_record(
+                Record.new(
+                    desired,
+                    f'host-{i}',
+                    dict(type='A', ttl=3600, value=f'2.2.2.{i}'),
+                )
+            )
+        return provider.plan(desired)
+
+    def _assert_new_zone(self, provider, count):
+        zone_id = provider._get_zone_id_by_name('new.tests.')
+        self.assertEqual(count, len(self.api.rrsets[zone_id]))
+        self.assertEqual(
+            {(r['name'], r['id']) for r in self.api.rrsets[zone_id].values()},
+            {
+                (name, cached.id)
+                for (name, _), cached in provider._zone_rrsets[
+                    'new.tests.'
+                ].items()
+            },
+        )
+
+    def _patch_runner(self):
+        # The asyncio client talks to the fake API in process
+        return patch(
+            'octodns_selectel.v2.provider.AsyncDNSClientRunner',
+            partial(AsyncDNSClientRunner, transport=self.api.transport()),
+        )
+
+    def test_new_zone_created_concurrently(self):
+        provider = self._provider(new_zone_concurrency=4)
+        plan = self._new_zone_plan(provider, 20)
+        with self._patch_runner():
+            self.assertEqual(20, provider.apply(plan))
+        self._assert_new_zone(provider, 20)
+
+    def test_created_ttl_cached_as_clamped(self):
+        # both ways of creating keep what the server has, ttl raised to
+        # MIN_TTL
+        for options in (dict(), dict(new_zone_concurrency=4)):
+            provider = self._provider(rrset_cache=True, **options)
+            desired = Zone(f'ttl-{len(options)}.tests.', [])
+            for i in range(2):
+                desired.add_record(
+                    Record.new(
+                        desired,
+                        f'host-{i}',
+                        dict(type='A', ttl=30, value='1.1.1.1'),
+                    )
+                )
+            with self._patch_runner():
+                provider.apply(provider.plan(desired))
+            self.assertEqual(
+                {SelectelProvider.MIN_TTL},
+                {
+                    cached.ttl
+                    for cached in provider._zone_rrsets[desired.name].values()
+                },
+                options,
+            )
+
+    @patch('octodns_selectel.v2.async_dns_client.httpx', None)
+    def test_new_zone_created_in_threads_without_httpx(self):
+        provider = self._provider(new_zone_concurrency=4)
+        plan = self._new_zone_plan(provider, 20)
+        self.assertEqual(20, provider.apply(plan))
+        self._assert_new_zone(provider, 20)
+
+    def test_new_zone_failures(self):
+        self.api.fail_next(400, route='/zones/{id}/rrset')
+        provider = self._provider(new_zone_concurrency=4)
+        plan = self._new_zone_plan(provider, 5)
+        with self._patch_runner():
+            with self.assertRaisesRegex(
+                SelectelException, r'^Failed to apply 1 change\(s\): '
+            ):
+                provider.apply(plan)
+        zone_id = provider._get_zone_id_by_name('new.tests.')
+        self.assertEqual(4, len(self.api.rrsets[zone_id]))
+        self.assertEqual(4, len(provider._zone_rrsets['new.tests.']))
+
+    def test_unknown_path(self):
+        self.assertEqual(
+            (404, {}, dict(error='not_found')),
+            self.api.handle('GET', '/domains/v2/unknown', None),
+        )
+
+    def _reports(self, directory, operation):
+        reports = []
+        for path in sorted(glob(join(directory, f'*-{operation}-*.json'))):
+            with open(path) as fh:
+                reports.append(load(fh))
+        return reports
+
+    def test_reports(self):
+        self.api.PAGINATION_MAX = 2
+        with TemporaryDirectory() as tmpdir:
+            provider = self._provider(
+                pagination_workers=2, max_workers=2, report_dir=tmpdir
+            )
+            self.api.fail_next(503, route='/zones/{id}/rrset')
+            zone = Zone(self._zone_name, [])
+            provider.populate(zone)
+            (report,) = self._reports(tmpdir, 'populate')
+            self.assertEqual('test', report['provider'])
+            self.assertEqual(self._zone_name, report['zone'])
+            self.assertIsNone(report['error'])
+            self.assertEqual(5, report['rrsets_listed'])
+            self.assertEqual(3, report['pages'])
+            # zone lookup, a retried page and 3 pages
+            self.assertEqual(5, report['api_calls'])
+            self.assertEqual(1, report['retries'])
+            self.assertGreater(report['response_bytes'], 0)
+            self.assertEqual(
+                ['GET /zones', 'GET /zones/{id}/rrset'],
+                list(report['endpoints']),
+            )
+            for name in ('network', 'mapping', 'records'):
+                self.assertGreater(report['time'][name], 0)
+
+            desired = Zone(self._zone_name, [])
+            for i in range(1, 4):
+                desired.add_record(
+                    Record.new(
+                        desired,
+                        f'host-{i}',
+                        dict(type='A', ttl=7200, value=f'1.1.1.{i}'),
+                    )
+                )
+            plan = provider.plan(desired)
+            self.api.fail_next(400, route='/zones/{id}/rrset/{id}')
+            provider.apply(plan)
+            (report,) = self._reports(tmpdir, 'apply')
+            self.assertEqual(0, report['rrsets_listed'])
+            # 3 updates and 2 deletes, the first of which fails
+            self.assertEqual(5, report['api_calls'])
+            self.assertEqual(dict(delete=1, update=3), report['changes'])
+            self.assertEqual(1, len(report['failures']))
+            self.assertRegex(report['failures'][0], r'^delete ')
+            self.assertGreater(report['request_bytes'], 0)
+
+    def test_reports_lookups_arent_pages(self):
+        self.api.PAGINATION_MAX = 2
+        with TemporaryDirectory() as tmpdir:
+            provider = self._provider(report_dir=tmpdir)
+            existing = Zone(self._zone_name, [])
+            record = Record.new(
+                existing, 'host-0', dict(type='A', ttl=3600, value='1.1.1.0')
+            )
+            existing.add_record(record)
+            desired = Zone(self._zone_name, [])
+            plan = Plan(existing, desired, [Delete(record)], True)
+            with patch.object(provider._client, '_PAGINATION_LIMIT', 2):
+                provider.apply(plan)
+            (report,) = self._reports(tmpdir, 'apply')
+            self.assertEqual(dict(delete=1), report['changes'])
+            self.assertEqual(0, report['pages'])
+            # zone lookup, count of rrsets, rrset lookup and the delete
+            self.assertEqual(4, report['api_calls'])
+
+    def test_reports_new_zone(self):
+        with TemporaryDirectory() as tmpdir:
+            provider = self._provider(new_zone_concurrency=4, report_dir=tmpdir)
+            plan = self._new_zone_plan(provider, 5)
+            self.api.fail_next(400, route='/zones/{id}/rrset')
+            with self._patch_runner():
+                with self.assertRaises(SelectelException):
+                    provider.apply(plan)
+            (report,) = self._reports(tmpdir, 'apply')
+            self.assertRegex(report['error'], r'^Failed to apply 1 change')
+            self.assertEqual(dict(create=4), report['changes'])
+            # zone creation and 5 rrset creates, plan looked the zone up
+            self.assertEqual(6, report['api_calls'])
+
+    def test_zones_in_parallel(self):
+        # Like octoDNS planning and applying with many workers, a single
+        # provider used by all of them
+        self.api.PAGINATION_MAX = 3
+        zones = [f'zone-{i}.tests.' for i in range(40)]
+        for zone_name in zones[::2]:
+            zone_id = self.api.add_zone(zone_name)['id']
+            for i in range(6):
+                self.api.add_rrset(
+                    zone_id, f'host-{i}.{zone_name}', 'A', 3600, ['1.1.1.1']
+                )
+        provider = self._provider(pagination_workers=2, max_workers=2)
+
+        def sync(zone_name):
+            desired = Zone(zone_name, [])
+            for i in range(1, 8):
+                desired.add_record(
+                    Record.new(
+                        desired,
+                        f'host-{i}',
+                        dict(type='A', ttl=3600, value=f'2.2.2.{i}'),
+                    )
+                )
+            plan = provider.plan(desired)
+            provider.apply(plan)
+            return len(plan.changes)
+
+        with ThreadPoolExecutor(16) as executor:
+            changes = list(executor.map(sync, zones))
+        # existing zones: 1 delete, 5 updates and 2 creates
+        self.assertEqual([8, 7] * 20, changes)
+
+        self.assertEqual(41, len(self.api.zones))
+        for zone_name in zones:
+            zone_id = provider._get_zone_id_by_name(zone_name)
+            self.assertEqual(zone_name, self.api.zones[zone_id]['name'])
+            rrsets = self.api.rrsets[zone_id].values()
+            self.assertEqual(
+                {(f'host-{i}.{zone_name}', f'2.2.2.{i}') for i in range(1, 8)},
+                {(r['name'], r['records'][0]['content']) for r in rrsets},
+            )
+            self.assertEqual(
+                {(r['name'], 'A'): r['id'] for r in rrsets},
+                {
+                    key: cached.id
+                    for key, cached in provider._zone_rrsets[zone_name].items()
+                },
+            )
+        # each zone looked up once, existing ones listed once
+        self.assertEqual(
+            40 + 20 * 2,
+            self.api.requests[('GET', '/zones')]
+            + self.api.requests[('GET', '/zones/{id}/rrset')],
+        )
+
+    def _add_zones(self, count, rrsets):
+        zone_names = [f'zone-{i}.tests.' for i in range(count)]
+        for zone_name in zone_names:
+            zone_id = self.api.add_zone(zone_name)['id']
+            for i in range(rrsets):
+                self.api.add_rrset(
+                    zone_id, f'host-{i}.{zone_name}', 'A', 3600, ['1.1.1.1']
+                )
+        return zone_names
+
+    def test_prefetch(self):
+        zone_names = self._add_zones(3, 4)
+        provider = self._provider(prefetch_workers=2)
+        provider.prefetch(zone_names[:2] + ['missing.tests.'])
+        # already on its way
+        provider.prefetch(zone_names[:1])
+        for prefetched in provider._prefetched.values():
+            prefetched.future.result()
+        self.api.reset_stats()
+
+        for zone_name in zone_names[:2] + ['missing.tests.']:
+            zone = Zone(zone_name, [])
+            self.assertEqual(
+                zone_name != 'missing.tests.', provider.populate(zone)
+            )
+            self.assertEqual(
+                (
+                    {f'host-{i}' for i in range(4)}
+                    if zone_name != 'missing.tests.'
+                    else set()
+                ),
+                {r.name for r in zone.records},
+            )
+        # served from what was downloaded, ids are known for apply
+        self.assertEqual(0, sum(self.api.requests.values()))
+        self.assertEqual(4, len(provider._zone_rrsets[zone_names[0]]))
+        self.assertIn(zone_names[0], provider._listed_zones)
+
+        # taken by populate, later ones list the zone again
+        provider.populate(Zone(zone_names[2], []))
+        self.assertEqual(1, self.api.requests[('GET', '/zones/{id}/rrset')])
+
+    def test_prefetch_reports(self):
+        with TemporaryDirectory() as tmpdir:
+            self.api.PAGINATION_MAX = 2
+            provider = self._provider(report_dir=tmpdir)
+            provider.prefetch([self._zone_name])
+            provider.populate(Zone(self._zone_name, []))
+            # the download is part of the populate taking it, prefetches
+            # have no reports of their own
+            (report,) = self._reports(tmpdir, '*')
+            self.assertEqual('populate', report['operation'])
+            self.assertEqual(5, report['rrsets_listed'])
+            self.assertEqual(3, report['pages'])
+            # zone lookup and 3 pages
+            self.assertEqual(4, report['api_calls'])
+            self.assertGreater(report['time']['network'], 0)
+
+    def test_prefetch_skips_cached_zones(self):
+        provider = self._provider(rrset_cache=True)
+        provider.populate(Zone(self._zone_name, []))
+        provider.prefetch([self._zone_name])
+        self.assertEqual({}, provider._prefetched)
+
+    def test_prefetch_close(self):
+        zone_names = self._add_zones(4, 1)
+        self.api.latency = 0.05
+        provider = self._provider(prefetch_workers=1)
+        # nothing to stop yet
+        provider.close()
+        provider.prefetch(zone_names)
+        futures = [p.future for p in provider._prefetched.values()]
+        provider.close()
+        self.assertEqual({}, provider._prefetched)
+        self.assertIsNone(provider._prefetch_executor)
+        # the one in progress finishes, the ones waiting never start
+        self.assertTrue(all(future.cancelled() for future in futures[1:]))
+        futures[0].result()
+
+        # and prefetching can start over
+        provider.prefetch(zone_names[:1])
+        provider.populate(Zone(zone_names[0], []))
+        provider.close()
+
+    def test_prefetch_on_list_zones(self):
+        zone_names = self._add_zones(3, 2)
+        self.api.latency = 0.05
+        provider = self._provider(prefetch_zones=True)
+        self.assertEqual(
+            sorted(zone_names + [self._zone_name]),
+            sorted(provider.list_zones()),
+        )
+        for zone_name in provider.list_zones():
+            provider.populate(Zone(zone_name, []))
+        # 4 zones listed once each, the second list_zones prefetched nothing
+        self.assertEqual(1, self.api.requests[('GET', '/zones')])
+        self.assertEqual(4, self.api.requests[('GET', '/zones/{id}/rrset')])
+
+        # nor does listing zones once they've been populated
+        self.api.reset_stats()
+        provider.list_zones()
+        self.assertEqual({}, provider._prefetched)
+        self.assertEqual(0, sum(self.api.requests.values()))
+
+        # while an explicit prefetch of all zones does
+        provider.prefetch()
+        self.assertEqual(4, len(provider._prefetched))
+        provider.populate(Zone(self._zone_name, []))
+        self.assertEqual(0, self.api.requests[('GET', '/zones')])
+        provider.close()
+
+    def test_prefetch_on_list_zones_skips_populated(self):
+        zone_names = self._add_zones(2, 2)
+        provider = self._provider(prefetch_zones=True)
+        provider.populate(Zone(self._zone_name, []))
+        provider.list_zones()
+        self.assertEqual(sorted(zone_names), sorted(provider._prefetched))
+        for zone_name in zone_names:
+            provider.populate(Zone(zone_name, []))
+        self.assertEqual({}, provider._prefetched)
+
+    def test_prefetch_failure(self):
+        provider = self._provider(prefetch_workers=1)
+        self.api.fail_next(400, route='/zones/{id}/rrset')
+        provider.prefetch([self._zone_name])
+        with self.assertRaises(SelectelException):
+            provider.populate(Zone(self._zone_name, []))
+        # not kept, the next populate lists the zone
+        provider.populate(Zone(self._zone_name, []))
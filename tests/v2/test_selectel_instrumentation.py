@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from octodns_selectel.v2.instrumentation import (
+    RequestEvent,
+    RequestStats,
+    path_template,
+)
+
+
+class TestSelectelInstrumentation(TestCase):
+    def test_path_template(self):
+        self.assertEqual('/zones', path_template('/zones'))
+        self.assertEqual('/zones/{id}/rrset', path_template('/zones/1/rrset'))
+        self.assertEqual(
+            '/zones/{id}/rrset/{id}', path_template('/zones/a-b/rrset/c-d')
+        )
+
+    def test_request_stats(self):
+        stats = RequestStats()
+        for i in range(1, 101):
+            stats(RequestEvent('GET', '/zones', 200, i / 1000, 0, 10, 0))
+        stats(RequestEvent('POST', '/zones', None, 1.5, 20, 0, 0))
+        stats(RequestEvent('POST', '/zones', 503, 0.5, 20, 5, 1))
+        stats(RequestEvent('POST', '/zones', 201, 0.1, 20, 30, 2))
+
+        summary = stats.summary()
+        self.assertEqual(['GET /zones', 'POST /zones'], list(summary))
+        self.assertEqual(
+            dict(
+                calls=100,
+                retries=0,
+                errors=0,
+                statuses={'200': 100},
+                request_bytes=0,
+                response_bytes=1000,
+                latency=dict(p50=0.05, p95=0.095, p99=0.099, max=0.1),
+            ),
+            summary['GET /zones'],
+        )
+        self.assertEqual(
+            dict(
+                calls=3,
+                retries=2,
+                errors=2,
+                statuses={'None': 1, '503': 1, '201': 1},
+                request_bytes=60,
+                response_bytes=35,
+                latency=dict(p50=0.5, p95=1.5, p99=1.5, max=1.5),
+            ),
+            summary['POST /zones'],
+        )
+
+        stats.reset()
+        self.assertEqual({}, stats.summary())
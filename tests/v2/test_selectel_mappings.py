@@ -15,10 +15,14 @@ from octodns.record import (
 )
 from octodns.zone import Zone
 
+from octodns_selectel.v2 import mappings
 from octodns_selectel.v2.exceptions import SelectelException
 from octodns_selectel.v2.mappings import (
+    register_codec,
     to_octodns_record_data,
+    to_octodns_records_data,
     to_selectel_rrset,
+    to_selectel_rrsets,
 )
 
 PairTest = collections.namedtuple("PairTest", ["record", "rrset"])
@@ -718,3 +722,51 @@ class TestSelectelMappings(TestCase):
                 selectel_exception.exception,
                 'DNS Record with type: INCORRECT not supported',
             )
+
+    def test_register_codec(self):
+        self.addCleanup(mappings._codecs.pop, "TEST")
+        register_codec(
+            "TEST",
+            lambda value: [dict(content=value.upper())],
+            lambda records: records[0]["content"].lower(),
+            key="value",
+        )
+        record = CnameRecord(
+            self.zone, "test", dict(type="CNAME", ttl=self.ttl, value="a.ru.")
+        )
+        record._type = "TEST"
+        rrset = to_selectel_rrset(record)
+        self.assertEqual([dict(content="A.RU.")], rrset["records"])
+        self.assertEqual(
+            dict(type="TEST", ttl=self.ttl, value="a.ru."),
+            to_octodns_record_data(rrset),
+        )
+
+    def test_mapping_batches(self):
+        records = [
+            ARecord(
+                self.zone, "a", dict(type="A", ttl=self.ttl, value="1.2.3.4")
+            ),
+            CnameRecord(
+                self.zone,
+                "cname",
+                dict(type="CNAME", ttl=self.ttl, value="a.test-octodns.ru."),
+            ),
+            MxRecord(
+                self.zone,
+                "",
+                dict(
+                    type="MX",
+                    ttl=self.ttl,
+                    value=dict(preference=10, exchange="mx.test-octodns.ru."),
+                ),
+            ),
+        ]
+        rrsets = to_selectel_rrsets(records)
+        self.assertEqual([to_selectel_rrset(r) for r in records], rrsets)
+        self.assertEqual(
+            [to_octodns_record_data(r) for r in rrsets],
+            to_octodns_records_data(rrsets),
+        )
+        self.assertEqual([], to_selectel_rrsets([]))
+        self.assertEqual([], to_octodns_records_data([]))
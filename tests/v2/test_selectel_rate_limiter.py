@@ -0,0 +1,89 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import requests_mock
+
+from octodns_selectel.session import DeadlineExceeded
+from octodns_selectel.v2 import rate_limiter
+from octodns_selectel.v2.dns_client import DNSClient
+from octodns_selectel.v2.rate_limiter import TokenBucket, get_rate_limiter
+
+
+class TestSelectelRateLimiter(TestCase):
+    def setUp(self):
+        self.now = 100.0
+        patcher = patch(
+            'octodns_selectel.v2.rate_limiter.monotonic',
+            side_effect=lambda: self.now,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('octodns_selectel.v2.rate_limiter.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(rate_limiter._buckets.clear)
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=2, burst=3)
+        self.assertEqual([0, 0, 0], [bucket.reserve() for _ in range(3)])
+        # empty bucket, callers are queued half a second apart
+        self.assertEqual([0.5, 1.0], [bucket.reserve() for _ in range(2)])
+        # refill pays back the debt first
+        self.now += 1.5
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0.5, bucket.reserve())
+
+    def test_refill_is_capped_by_burst(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.now += 3600
+        self.assertEqual([0, 0], [bucket.reserve() for _ in range(2)])
+        self.assertEqual(0.1, bucket.reserve())
+
+    def test_acquire(self):
+        bucket = TokenBucket(rate=4, burst=1)
+        bucket.acquire()
+        self.sleep.assert_not_called()
+        bucket.acquire()
+        self.sleep.assert_called_once_with(0.25)
+
+    def test_shared_per_token(self):
+        bucket = get_rate_limiter('token-1', 5, 10)
+        self.assertIs(bucket, get_rate_limiter('token-1', 1, 1))
+        self.assertEqual(5, bucket.rate)
+        self.assertIsNot(bucket, get_rate_limiter('token-2', 5, 10))
+
+    @requests_mock.Mocker()
+    def test_dns_clients_share_limiter(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(count=0, next_offset=0, result=[]),
+        )
+        source = DNSClient('0.0.1', 'token', rate_limit=1)
+        target = DNSClient('0.0.1', 'token', rate_limit=1)
+        unlimited = DNSClient('0.0.1', 'token')
+        self.assertIs(source._rate_limiter, target._rate_limiter)
+        self.assertIsNone(unlimited._rate_limiter)
+
+        with patch('octodns_selectel.v2.dns_client.sleep') as fake_sleep:
+            source.list_zones()
+            target.list_zones()
+            unlimited.list_zones()
+        fake_sleep.assert_called_once_with(1)
+
+    @requests_mock.Mocker()
+    @patch('octodns_selectel.session.monotonic', return_value=0)
+    @patch('octodns_selectel.v2.dns_client.sleep')
+    def test_wait_past_deadline(self, fake_http, fake_sleep, fake_monotonic):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(count=0, next_offset=0, result=[]),
+        )
+        dns_client = DNSClient(
+            '0.0.1', 'token', rate_limit=0.1, rate_limit_burst=1, deadline=5
+        )
+        dns_client.list_zones()
+        # the next turn is 10s away, past the deadline
+        with self.assertRaises(DeadlineExceeded):
+            dns_client.list_zones()
+        self.assertEqual(1, fake_http.call_count)
+        fake_sleep.assert_not_called()
@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from octodns_selectel.v2.instrumentation import RequestEvent
+from octodns_selectel.v2.report import (
+    ZoneReport,
+    current_report,
+    observe,
+    record_change,
+    record_failure,
+    reporting,
+    zone_report,
+)
+
+
+class TestSelectelReport(TestCase):
+    def test_outside_of_operations(self):
+        self.assertIsNone(current_report())
+        # nothing to feed, nothing happens
+        observe(RequestEvent('GET', '/zones', 200, 0.1, 0, 10, 0))
+        record_change('create')
+        record_failure('delete 1: Conflict')
+
+    def test_zone_report(self):
+        with zone_report('test', 'unit.tests.', 'apply') as report:
+            self.assertIs(report, current_report())
+            observe(RequestEvent('GET', '/zones/{id}/rrset', 200, 0.1, 0, 5, 0))
+            report.page([dict(id='1')])
+            observe(RequestEvent('GET', '/zones/{id}/rrset', 503, 0.2, 0, 0, 1))
+            observe(
+                RequestEvent('POST', '/zones/{id}/rrset', 201, 0.3, 7, 9, 0)
+            )
+            record_change('create')
+            record_change('create')
+            record_failure('delete 1: Conflict')
+            with report.timed('mapping'):
+                pass
+        self.assertIsNone(current_report())
+
+        data = report.to_dict()
+        self.assertEqual('unit.tests.', data['zone'])
+        self.assertEqual('apply', data['operation'])
+        self.assertEqual(1, data['pages'])
+        self.assertEqual(dict(create=2), data['changes'])
+        self.assertEqual(['delete 1: Conflict'], data['failures'])
+        self.assertEqual(3, data['api_calls'])
+        self.assertEqual(1, data['retries'])
+        self.assertEqual(7, data['request_bytes'])
+        self.assertEqual(14, data['response_bytes'])
+        self.assertAlmostEqual(0.6, data['time']['network'])
+        self.assertGreater(data['time']['mapping'], 0)
+        self.assertEqual(0, data['time']['records'])
+        self.assertGreater(data['wall_time'], 0)
+
+    def test_merge(self):
+        report = ZoneReport('test', 'unit.tests.', 'populate')
+        other = ZoneReport('test', 'unit.tests.', 'prefetch')
+        with reporting(other):
+            observe(RequestEvent('GET', '/zones/{id}/rrset', 200, 0.1, 0, 5, 1))
+            other.page([dict(id='1')])
+            other.rrsets_listed += 1
+        report.request(RequestEvent('GET', '/zones', 200, 0.2, 0, 3, 0))
+        report.merge(other)
+        data = report.to_dict()
+        self.assertEqual(1, data['pages'])
+        self.assertEqual(1, data['rrsets_listed'])
+        self.assertEqual(2, data['api_calls'])
+        self.assertEqual(1, data['retries'])
+        self.assertEqual(8, data['response_bytes'])
+        self.assertAlmostEqual(0.3, data['time']['network'])
+
+    def test_zone_report_error(self):
+        with self.assertRaises(ValueError):
+            with zone_report('test', 'unit.tests.', 'populate') as report:
+                raise ValueError('boom')
+        self.assertEqual('boom', report.error)
@@ -0,0 +1,227 @@
+import importlib
+import sys
+from contextlib import nullcontext
+from functools import partial
+from unittest import TestCase
+from unittest.mock import patch
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import SpanKind, StatusCode
+
+from octodns.record import Record
+from octodns.zone import Zone
+
+from octodns_selectel.v2 import tracing
+from octodns_selectel.v2.async_dns_client import AsyncDNSClientRunner
+from octodns_selectel.v2.provider import SelectelProvider
+from tests.fake_api_server import FakeSelectelApi
+
+
+class TestSelectelTracing(TestCase):
+    def test_get_tracer(self):
+        self.assertIsNotNone(tracing.get_tracer())
+
+    def test_without_opentelemetry(self):
+        try:
+            with patch.dict(sys.modules, {'opentelemetry': None}):
+                module = importlib.reload(tracing)
+                self.assertIsNone(module.get_tracer())
+        finally:
+            importlib.reload(tracing)
+
+    def test_start_span_without_tracer(self):
+        self.assertIsInstance(
+            tracing.start_span(None, 'selectel.populate'), nullcontext
+        )
+
+    @patch('octodns_selectel.v2.provider.get_tracer', lambda: None)
+    def test_provider_without_opentelemetry(self):
+        with self.assertLogs('SelectelProvider[test]', 'WARNING') as logs:
+            provider = SelectelProvider('test', 'token', tracing=True)
+        self.assertIn('OpenTelemetry API is not installed', logs.output[0])
+        self.assertIsNone(provider._tracer)
+        self.assertIsNone(provider._client._tracer)
+
+
+# Spans of a provider talking to the fake API, collected in memory
+@pytest.mark.usefixtures('enable_network')
+class TestSelectelTracingFakeApi(TestCase):
+    _zone_name = 'unit.tests.'
+
+    def setUp(self):
+        self.api = FakeSelectelApi().start()
+        self.addCleanup(self.api.stop)
+        self.api.PAGINATION_MAX = 2
+        self.zone_id = self.api.add_zone(self._zone_name)['id']
+        for i in range(5):
+            self.api.add_rrset(
+                self.zone_id,
+                f'host-{i}.{self._zone_name}',
+                'A',
+                3600,
+                [f'1.1.1.{i}'],
+            )
+        self.exporter = InMemorySpanExporter()
+        tracer_provider = TracerProvider()
+        tracer_provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        tracer = tracer_provider.get_tracer('test')
+        patcher = patch(
+            'octodns_selectel.v2.provider.get_tracer', lambda: tracer
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _provider(self, **kwargs):
+        provider = SelectelProvider(
+            'test', 'token', retry_backoff=0, tracing=True, **kwargs
+        )
+        provider._client.API_URL = self.api.url
+        return provider
+
+    def _spans(self, name):
+        return [s for s in self.exporter.get_finished_spans() if s.name == name]
+
+    def test_populate_and_apply(self):
+        provider = self._provider(pagination_workers=2, max_workers=2)
+        self.api.fail_next(503, route='/zones/{id}/rrset')
+        zone = Zone(self._zone_name, [])
+        provider.populate(zone)
+
+        (populate,) = self._spans('selectel.populate')
+        self.assertEqual(
+            {'selectel.zone': self._zone_name}, dict(populate.attributes)
+        )
+        requests = self._spans('selectel.request')
+        # zone lookup and 3 pages, the first one of which was retried
+        self.assertEqual(4, len(requests))
+        for span in requests:
+            self.assertEqual(SpanKind.CLIENT, span.kind)
+            # pages fetched by workers are still part of the populate
+            self.assertEqual(populate.context.span_id, span.parent.span_id)
+        self.assertEqual(
+            [
+                ('/zones', 0, 200, 0),
+                ('/zones/{id}/rrset', 0, 200, 1),
+                ('/zones/{id}/rrset', 2, 200, 0),
+                ('/zones/{id}/rrset', 4, 200, 0),
+            ],
+            sorted(
+                (
+                    s.attributes['url.template'],
+                    s.attributes.get('selectel.page.offset'),
+                    s.attributes['http.response.status_code'],
+                    s.attributes['selectel.retries'],
+                )
+                for s in requests
+            ),
+        )
+
+        self.exporter.clear()
+        desired = Zone(self._zone_name, [])
+        desired.add_record(
+            Record.new(
+                desired, 'host-1', dict(type='A', ttl=60, value='2.2.2.2')
+            )
+        )
+        plan = provider.plan(desired)
+        self.exporter.clear()
+        self.api.fail_next(400, route='/zones/{id}/rrset/{id}')
+        provider.apply(plan)
+
+        (apply,) = self._spans('selectel.apply')
+        self.assertEqual(
+            {'selectel.zone': self._zone_name, 'selectel.changes': 5},
+            dict(apply.attributes),
+        )
+        changes = self._spans('selectel.change')
+        self.assertEqual(
+            [('delete', f'host-{i}.unit.tests.', 'A') for i in (0, 2, 3, 4)]
+            + [('update', 'host-1.unit.tests.', 'A')],
+            sorted(
+                (
+                    s.attributes['selectel.change.action'],
+                    s.attributes['selectel.rrset.name'],
+                    s.attributes['selectel.rrset.type'],
+                )
+                for s in changes
+            ),
+        )
+        change_ids = set()
+        for span in changes:
+            self.assertEqual(apply.context.span_id, span.parent.span_id)
+            change_ids.add(span.context.span_id)
+        requests = self._spans('selectel.request')
+        self.assertEqual(5, len(requests))
+        for span in requests:
+            self.assertIn(span.parent.span_id, change_ids)
+        # the failed delete is logged and skipped, its request span isn't ok
+        (failed,) = [
+            s for s in requests if s.status.status_code == StatusCode.ERROR
+        ]
+        self.assertEqual(400, failed.attributes['http.response.status_code'])
+
+    def test_new_zone(self):
+        provider = self._provider(new_zone_concurrency=4)
+        desired = Zone('new.tests.', [])
+        for i in range(3):
+            desired.add_record(
+                Record.new(
+                    desired,
+                    f'host-{i}',
+                    dict(type='A', ttl=60, value='1.1.1.1'),
+                )
+            )
+        plan = provider.plan(desired)
+        self.exporter.clear()
+        with patch(
+            'octodns_selectel.v2.provider.AsyncDNSClientRunner',
+            partial(AsyncDNSClientRunner, transport=self.api.transport()),
+        ):
+            provider.apply(plan)
+        (apply,) = self._spans('selectel.apply')
+        changes = self._spans('selectel.change')
+        # a span per create made on the event loop, like for any change
+        self.assertEqual(
+            [('create', f'host-{i}.new.tests.', 'A') for i in range(3)],
+            sorted(
+                (
+                    s.attributes['selectel.change.action'],
+                    s.attributes['selectel.rrset.name'],
+                    s.attributes['selectel.rrset.type'],
+                )
+                for s in changes
+            ),
+        )
+        for span in changes:
+            self.assertEqual(apply.context.span_id, span.parent.span_id)
+        requests = self._spans('selectel.request')
+        # zone creation under the apply, each of the 3 rrsets created on the
+        # event loop under its change
+        self.assertEqual(
+            sorted(
+                [apply.context.span_id]
+                + [span.context.span_id for span in changes]
+            ),
+            sorted(span.parent.span_id for span in requests),
+        )
+        for span in requests:
+            self.assertEqual(201, span.attributes['http.response.status_code'])
+
+    def test_prefetch(self):
+        provider = self._provider()
+        provider.prefetch([self._zone_name])
+        provider.populate(Zone(self._zone_name, []))
+        (prefetch,) = self._spans('selectel.prefetch')
+        self.assertEqual(
+            {'selectel.zone': self._zone_name}, dict(prefetch.attributes)
+        )
+        # the download is traced as its own span, apart from the populate
+        requests = self._spans('selectel.request')
+        self.assertEqual(4, len(requests))
+        for span in requests:
+            self.assertEqual(prefetch.context.span_id, span.parent.span_id)
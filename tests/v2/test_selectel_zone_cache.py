@@ -0,0 +1,57 @@
+from os.path import exists
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from octodns_selectel.v2.zone_cache import ZoneCache
+
+
+class TestSelectelZoneCache(TestCase):
+    api_url = 'https://api.selectel.ru/domains/v2'
+    zones = {'unit.tests.': dict(id='1', name='unit.tests.')}
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def _cache(self, token='token', ttl=60):
+        return ZoneCache(
+            f'{self.directory.name}/cache', self.api_url, token, ttl
+        )
+
+    def test_save_load(self):
+        cache = self._cache()
+        self.assertIsNone(cache.load())
+        cache.save(self.zones)
+        self.assertEqual(self.zones, cache.load())
+        self.assertEqual(self.zones, self._cache().load())
+        self.assertNotIn('token', cache.path)
+
+    def test_keyed_by_token(self):
+        self._cache().save(self.zones)
+        self.assertIsNone(self._cache(token='other-token').load())
+
+    def test_expired(self):
+        cache = self._cache(ttl=60)
+        with patch('octodns_selectel.v2.zone_cache.time', return_value=1000):
+            cache.save(self.zones)
+        with patch('octodns_selectel.v2.zone_cache.time', return_value=1060):
+            self.assertEqual(self.zones, cache.load())
+        with patch('octodns_selectel.v2.zone_cache.time', return_value=1061):
+            self.assertIsNone(cache.load())
+
+    def test_corrupted(self):
+        cache = self._cache()
+        cache.save(self.zones)
+        with open(cache.path, 'w') as fh:
+            fh.write('{"cached_at": ')
+        self.assertIsNone(cache.load())
+
+    def test_invalidate(self):
+        cache = self._cache()
+        cache.save(self.zones)
+        cache.invalidate()
+        self.assertFalse(exists(cache.path))
+        self.assertIsNone(cache.load())
+        # nothing to invalidate is fine too
+        cache.invalidate()